@@ -4,27 +4,45 @@ COMPONENT_DOXYGEN_INPUT := src/include
 
 TZ_COMPILE_CMDLINE := $(PYTHON) $(COMPONENT_PATH)/tools/compile.py
 
-COMPONENT_VARS := APP_TZDATA_OPTS APP_TZDATA_DIR
+COMPONENT_VARS := APP_TZDATA_OPTS APP_TZDATA_DIR APP_TZDATA_SPLIT
 APP_TZDATA_OPTS ?= --name --tzstr full
 APP_TZDATA_DIR ?= $(PROJECT_DIR)/out/Timezone
+APP_TZDATA_SPLIT ?= 0
 
 ifdef APP_TZDATA_DIR
 
 TZDATA_FILES := $(addprefix $(APP_TZDATA_DIR)/,tzdata.h tzdata.cpp)
 
-$(TZDATA_FILES): | $(APP_TZDATA_DIR)
-	$(TZ_COMPILE_CMDLINE) $(APP_TZDATA_OPTS) $(APP_TZDATA_DIR)
+ifeq ($(APP_TZDATA_SPLIT),1)
+TZDATA_SPLIT_OPTS := --split
+endif
+
+# Regenerate data when options change
+TZDATA_CMDLINE_OPTS := $(strip $(APP_TZDATA_OPTS) $(TZDATA_SPLIT_OPTS))
+TZDATA_OPTS_FILE := $(APP_TZDATA_DIR)/tzdata.opts
+ifneq ($(TZDATA_CMDLINE_OPTS),$(shell cat $(TZDATA_OPTS_FILE) 2>/dev/null))
+$(shell mkdir -p $(APP_TZDATA_DIR) && echo "$(TZDATA_CMDLINE_OPTS)" > $(TZDATA_OPTS_FILE))
+endif
+
+# Files are only written if their content changes
+$(TZDATA_FILES): $(TZDATA_OPTS_FILE) | $(APP_TZDATA_DIR)
+	$(TZ_COMPILE_CMDLINE) $(TZDATA_CMDLINE_OPTS) $(APP_TZDATA_DIR)
+	$(Q) touch $(TZDATA_FILES)
 
 $(APP_TZDATA_DIR):
 	$(Q) mkdir -p $@
 
 COMPONENT_PREREQUISITES := $(TZDATA_FILES)
 COMPONENT_APPCODE := $(APP_TZDATA_DIR)
+ifeq ($(APP_TZDATA_SPLIT),1)
+COMPONENT_APPCODE += $(APP_TZDATA_DIR)/tzdata
+endif
 COMPONENT_INCDIRS += $(APP_TZDATA_DIR)
 
 .PHONY: tzdata-clean
 tzdata-clean:
-	$(Q) rm -f $(TZDATA_FILES)
+	$(Q) rm -f $(TZDATA_FILES) $(TZDATA_OPTS_FILE)
+	$(Q) rm -rf $(APP_TZDATA_DIR)/tzdata
 
 clean: tzdata-clean
 
@@ -45,6 +45,29 @@ uint16_t getYear(time_t t)
 	return DateTime(t).Year;
 }
 
+time_t getYearStart(unsigned year)
+{
+	DateTime dt;
+	dt.Day = 1;
+	dt.Month = month_t::Jan;
+	dt.Year = year;
+	return dt;
+}
+
+/*
+ * Determine whether time is in the DST period, with start/end times given for the same year.
+ */
+bool isDstPeriod(time_t t, time_t dstStart, time_t stdStart)
+{
+	// northern hemisphere
+	if(stdStart > dstStart) {
+		return (t >= dstStart) && (t < stdStart);
+	}
+
+	// southern hemisphere
+	return (t >= dstStart) || (t < stdStart);
+}
+
 time_t Timezone::toLocal(time_t utc, const Rule** rule)
 {
 	auto& tcr = getRule(utcIsDST(utc));
@@ -71,6 +94,48 @@ ZonedTime Timezone::toUTC(time_t local)
 	return ZonedTime{utc, {tcr.tag, tcr.offsetMins, isDst}};
 }
 
+void Timezone::toLocal(const time_t* utc, time_t* local, size_t count)
+{
+	auto stdOffset = stdRule.offsetSecs();
+	if(!hasDst) {
+		for(size_t i = 0; i < count; ++i) {
+			local[i] = utc[i] + stdOffset;
+		}
+		return;
+	}
+
+	auto dstOffset = dstRule.offsetSecs();
+	const YearChanges* changes{nullptr};
+	for(size_t i = 0; i < count; ++i) {
+		auto t = utc[i];
+		if(!changes || !changes->contains(t)) {
+			changes = &getChanges(t);
+		}
+		local[i] = t + (utcIsDST(*changes, t) ? dstOffset : stdOffset);
+	}
+}
+
+void Timezone::toUTC(const time_t* local, time_t* utc, size_t count)
+{
+	auto stdOffset = stdRule.offsetSecs();
+	if(!hasDst) {
+		for(size_t i = 0; i < count; ++i) {
+			utc[i] = local[i] - stdOffset;
+		}
+		return;
+	}
+
+	auto dstOffset = dstRule.offsetSecs();
+	const YearChanges* changes{nullptr};
+	for(size_t i = 0; i < count; ++i) {
+		auto t = local[i];
+		if(!changes || !changes->contains(t)) {
+			changes = &getChanges(t);
+		}
+		utc[i] = t - (locIsDST(*changes, t) ? dstOffset : stdOffset);
+	}
+}
+
 Timezone Timezone::fromPosix(const char* tzstr)
 {
 	Rule dst;
@@ -87,19 +152,7 @@ bool Timezone::utcIsDST(time_t utc)
 		return false;
 	}
 
-	// recalculate the time change points if needed
-	auto y = getYear(utc);
-	if(y != getYear(dstStartUTC)) {
-		calcTimeChanges(y);
-	}
-
-	// northern hemisphere
-	if(stdStartUTC > dstStartUTC) {
-		return (utc >= dstStartUTC) && (utc < stdStartUTC);
-	}
-
-	// southern hemisphere
-	return (utc >= dstStartUTC) || (utc < stdStartUTC);
+	return utcIsDST(getChanges(utc), utc);
 }
 
 bool Timezone::locIsDST(time_t local)
@@ -108,28 +161,38 @@ bool Timezone::locIsDST(time_t local)
 		return false;
 	}
 
-	// recalculate the time change points if needed
-	auto y = getYear(local);
-	if(y != getYear(dstStartUTC + stdRule.offsetSecs())) {
-		calcTimeChanges(y);
-	}
-
-	time_t dstStartLoc = dstStartUTC + stdRule.offsetSecs();
-	time_t stdStartLoc = stdStartUTC + dstRule.offsetSecs();
+	return locIsDST(getChanges(local), local);
+}
 
-	// northern hemisphere
-	if(stdStartLoc > dstStartLoc) {
-		return (local >= dstStartLoc && local < stdStartLoc);
-	}
+bool Timezone::utcIsDST(const YearChanges& changes, time_t utc) const
+{
+	return isDstPeriod(utc, changes.dstStartUTC, changes.stdStartUTC);
+}
 
-	// southern hemisphere
-	return (local >= dstStartLoc) || (local < stdStartLoc);
+bool Timezone::locIsDST(const YearChanges& changes, time_t local) const
+{
+	time_t dstStartLoc = changes.dstStartUTC + stdRule.offsetSecs();
+	time_t stdStartLoc = changes.stdStartUTC + dstRule.offsetSecs();
+	return isDstPeriod(local, dstStartLoc, stdStartLoc);
 }
 
-void Timezone::calcTimeChanges(unsigned yr)
+const Timezone::YearChanges& Timezone::getChanges(time_t t)
 {
-	dstStartUTC = dstRule(yr) - stdRule.offsetSecs();
-	stdStartUTC = stdRule(yr) - dstRule.offsetSecs();
+	for(auto& changes : yearCache) {
+		if(changes.contains(t)) {
+			return changes;
+		}
+	}
+
+	// Replace oldest entry
+	auto& changes = yearCache[yearCacheNext];
+	yearCacheNext = (yearCacheNext + 1) % yearCacheSize;
+	auto year = getYear(t);
+	changes.start = getYearStart(year);
+	changes.end = getYearStart(year + 1);
+	changes.dstStartUTC = dstRule(year) - stdRule.offsetSecs();
+	changes.stdStartUTC = stdRule(year) - dstRule.offsetSecs();
+	return changes;
 }
 
 time_t Rule::operator()(unsigned year) const
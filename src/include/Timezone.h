@@ -278,6 +278,25 @@ public:
 	 */
 	ZonedTime toUTC(time_t local);
 
+	/**
+	 * @brief Convert an array of UTC times to local time
+	 * @param utc Times in UTC
+	 * @param local Buffer for local times, may be the same as `utc`
+	 * @param count Number of times to convert
+	 * @note Times are typically close together, so the DST boundaries for one are re-used for the next
+	 * without decoding its year.
+	 */
+	void toLocal(const time_t* utc, time_t* local, size_t count);
+
+	/**
+	 * @brief Convert an array of local times to UTC
+	 * @param local Local times
+	 * @param utc Buffer for UTC times, may be the same as `local`
+	 * @param count Number of times to convert
+	 * @note See `toUTC(time_t)` for limitations
+	 */
+	void toUTC(const time_t* local, time_t* utc, size_t count);
+
 	/**
 	 * @brief Determine whether the UTC time is within the DST interval or the Standard time interval
 	 * @param utc
@@ -362,18 +381,39 @@ public:
 	size_t printTo(Print& p) const;
 
 private:
+	/**
+	 * @brief DST and standard time change points for one year
+	 */
+	struct YearChanges {
+		time_t start{invalidTime}; ///< Start of year
+		time_t end{invalidTime};   ///< Start of following year
+		time_t dstStartUTC;		   ///< dst start, given in UTC
+		time_t stdStartUTC;		   ///< std time start, given in UTC
+
+		bool contains(time_t t) const
+		{
+			return t >= start && t < end;
+		}
+	};
+
 	/*
-	 * Calculate the DST and standard time change points for the given
-	 * given year as local and UTC time_t values.
+	 * Get the DST and standard time change points for the year containing the given time,
+	 * which may be UTC or local. Entries for recently used years are kept so that
+	 * times alternating between years, or between UTC and local, don't recalculate them.
 	 */
-	void calcTimeChanges(unsigned yr);
+	const YearChanges& getChanges(time_t t);
+
+	bool utcIsDST(const YearChanges& changes, time_t utc) const;
+	bool locIsDST(const YearChanges& changes, time_t local) const;
+
+	static constexpr unsigned yearCacheSize{4};
 
 private:
-	Rule dstRule{};					 ///< rule for start of dst or summer time for any year
-	Rule stdRule{};					 ///< rule for start of standard time for any year
-	time_t dstStartUTC{invalidTime}; ///< dst start for given/current year, given in UTC
-	time_t stdStartUTC{invalidTime}; ///< std time start for given/current year, given in UTC
-	bool hasDst{};					 ///< false if rules are the same
+	Rule dstRule{};						   ///< rule for start of dst or summer time for any year
+	Rule stdRule{};						   ///< rule for start of standard time for any year
+	YearChanges yearCache[yearCacheSize]{}; ///< Change points for recently used years
+	uint8_t yearCacheNext{};			   ///< Cache entry to replace next
+	bool hasDst{};						   ///< false if rules are the same
 };
 
 } // namespace TZ
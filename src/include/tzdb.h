@@ -56,6 +56,9 @@
 #define TZ_DEFINE_PSTR_LOCAL(name, s) \
     static constexpr const char* name PROGMEM_PSTR  = s;
 
+#define TZ_DEFINE_TRANSITION_TABLE_LOCAL(name, types, data) \
+	static constexpr const TransitionTable name PROGMEM {types, data};
+
 #define TIMEZONE_BEGIN(clsname, area_, location_) \
 	class clsname : public Timezone { \
 	public: \
@@ -96,8 +99,203 @@ struct Transition {
 static_assert(sizeof(Transition) == 8, "Bad Transition def");
 #endif
 
+/**
+ * @brief Offset, DST flag and designator shared by transitions in a `TransitionTable`
+ */
+struct TimeType {
+	int16_t offsetMins : 15;
+	bool isdst : 1;
+	uint8_t desigidx;
+};
+
+/**
+ * @brief Delta-encoded transition list
+ *
+ * Data starts with the number of transitions, followed by an entry for each one:
+ * the time difference from the previous transition then the index of its time type.
+ * Time differences are zigzag-encoded varints, with bit 0 set if the value is in minutes.
+ *
+ * Transitions can only be read in sequence, using an iterator.
+ */
+struct TransitionTable {
+	const FSTR::Array<TimeType>& types;
+	const FSTR::Array<uint8_t>& data;
+
+	class Iterator
+	{
+	public:
+		Iterator() : table(nullptr), index(0), count(0), pos(0)
+		{
+		}
+
+		Iterator(const TransitionTable& table, unsigned index, unsigned count);
+
+		const Transition& operator*() const
+		{
+			return transition;
+		}
+
+		const Transition* operator->() const
+		{
+			return &transition;
+		}
+
+		Iterator& operator++()
+		{
+			if(++index < count) {
+				readNext();
+			}
+			return *this;
+		}
+
+		Iterator operator++(int)
+		{
+			auto it = *this;
+			++(*this);
+			return it;
+		}
+
+		bool operator==(const Iterator& other) const
+		{
+			return index == other.index;
+		}
+
+		bool operator!=(const Iterator& other) const
+		{
+			return index != other.index;
+		}
+
+	private:
+		friend TransitionTable;
+
+		void readNext();
+		uint64_t readVarint();
+
+		const TransitionTable* table;
+		unsigned index;
+		unsigned count;
+		unsigned pos;
+		Transition transition{};
+	};
+
+	size_t length() const;
+
+	Iterator begin() const
+	{
+		return Iterator(*this, 0, length());
+	}
+
+	Iterator end() const
+	{
+		auto count = length();
+		return Iterator(*this, count, count);
+	}
+};
+
+/**
+ * @brief Class to support local/UTC time conversions using a transition table
+ *
+ * Times within the range of the table are converted using the offsets it records,
+ * so are correct for periods when different rules were in effect.
+ * Times before the first transition, or from the last one onwards, are converted using the POSIX rules.
+ *
+ * The position of the last lookup is kept so converting times in sequence
+ * generally reads only one or two table entries.
+ * Otherwise, a full transition array is binary-searched.
+ * A delta-encoded `TransitionTable` can only be read forwards so is scanned, restarting if a time
+ * precedes the previous one.
+ */
+class HistoricalTimezone
+{
+public:
+	using Transitions = FSTR::Array<Transition>;
+
+	/**
+	 * @brief Create a timezone using a transition array
+	 * @param rules Timezone to use outside the range of transitions
+	 * @param tznames Designator strings, indexed by `Transition::desigidx`
+	 * @param transitions Sorted transition list
+	 */
+	HistoricalTimezone(const Timezone& rules, PGM_P tznames, const Transitions& transitions)
+		: rules(rules), tznames(tznames), array(&transitions), count(transitions.length())
+	{
+	}
+
+	/**
+	 * @brief Create a timezone using a delta-encoded transition table
+	 */
+	HistoricalTimezone(const Timezone& rules, PGM_P tznames, const TransitionTable& transitions)
+		: rules(rules), tznames(tznames), table(&transitions), count(transitions.length())
+	{
+	}
+
+	/**
+	 * @brief Obtain a ZonedTime instance for the given UTC
+	 * @param utc Time in UTC
+	 * @retval ZonedTime Contains the UTC time given plus offset, etc. at that point in time
+	 */
+	ZonedTime makeZoned(time_t utc);
+
+	/**
+	 * @brief Convert the given UTC time to local time
+	 * @param utc Time in UTC
+	 * @retval time_t The local time
+	 */
+	time_t toLocal(time_t utc)
+	{
+		return makeZoned(utc).local();
+	}
+
+	/**
+	 * @brief Convert the given local time to UTC time
+	 * @param local Local time
+	 * @retval ZonedTime Contains UTC point in time with associated local offset, etc.
+	 * @note As for `Timezone::toUTC()`, local times which occur twice are treated as the earlier time
+	 * and local times which do not exist give an incorrect result.
+	 */
+	ZonedTime toUTC(time_t local);
+
+	/**
+	 * @brief Get the timezone used outside the range of transitions
+	 */
+	Timezone& getRules()
+	{
+		return rules;
+	}
+
+private:
+	/*
+	 * Locate last transition at or before the given time, leaving it as the current position.
+	 * Local times are compared using the offset in effect before each transition.
+	 * Returns false if time precedes the first transition or follows the last one.
+	 */
+	bool seek(time_t time, bool local);
+
+	Transition current() const
+	{
+		return array ? (*array)[index] : *iter;
+	}
+
+	DateTime::ZoneInfo getInfo(const Transition& tt) const;
+
+	Timezone rules;
+	PGM_P tznames;
+	const Transitions* array{};
+	const TransitionTable* table{};
+	TransitionTable::Iterator iter;
+	unsigned count;
+	unsigned index{}; ///< Current position in table
+	int16_t prevOffsetMins{}; ///< Offset in effect before current transition, for table scanning
+};
+
 static constexpr const Rule PROGMEM rule_none{};
+#if TZINFO_TRANSITIONS_DELTA
+DEFINE_FSTR_ARRAY_LOCAL(timetypes_none, TimeType)
+DEFINE_FSTR_ARRAY_LOCAL(transition_data_none, uint8_t)
+TZ_DEFINE_TRANSITION_TABLE_LOCAL(transitions_none, timetypes_none, transition_data_none)
+#else
 DEFINE_FSTR_ARRAY_LOCAL(transitions_none, Transition)
+#endif
 
 struct Info {
 	PGM_P location;
@@ -113,8 +311,12 @@ struct Info {
 #endif
 #if TZINFO_WANT_TRANSITIONS
 	PGM_P tznames;
+#if TZINFO_TRANSITIONS_DELTA
+	const TransitionTable& transitions;
+#else
 	const FSTR::Array<Transition>& transitions;
 #endif
+#endif
 
 #if TZINFO_WANT_NAME
 	String name() const
@@ -145,6 +347,14 @@ struct Info {
 			.isDst = tt.isdst,
 		};
 	}
+
+	/**
+	 * @brief Get a timezone which uses the transition table for historical times
+	 */
+	HistoricalTimezone historical() const
+	{
+		return HistoricalTimezone(*this, tznames, transitions);
+	}
 #endif
 
 	explicit operator bool() const
@@ -160,6 +370,28 @@ using AreaMap = FSTR::Map<FSTR::String, ZoneList>;
 
 DECLARE_FSTR_MAP(areas, FSTR::String, ZoneList)
 
+/**
+ * @brief Entry in zone lookup index, generated alongside `areas`
+ */
+struct ZoneIndexEntry {
+	uint32_t hash; ///< Hash of normalised full zone name, see `getZoneNameHash()`
+	const FSTR::String* area;
+	const Info* info;
+};
+
+/**
+ * @brief Zone index, sorted by hash
+ */
+DECLARE_FSTR_ARRAY(zoneIndex, ZoneIndexEntry)
+
+/**
+ * @brief Get hash of a zone name as used in `zoneIndex`
+ * @param name Zone name
+ * @param length Length of name
+ * @retval uint32_t 32-bit FNV-1a hash of name with all non-alphabetic characters removed, converted to lower case
+ */
+uint32_t getZoneNameHash(const char* name, size_t length);
+
 /**
  * @brief Find a zone given its full name
  * @param name Full name of zone
@@ -171,7 +403,8 @@ DECLARE_FSTR_MAP(areas, FSTR::String, ZoneList)
  *	"america port au  prince" matches "America/Port-au-Prince"
  *
  * This makes things a bit easier with little risk of false-positives.
- * 
+ *
+ * Lookup uses a binary search of `zoneIndex` so only a few entries are read from flash.
  */
 const Info* findZone(const String& name);
 
@@ -26,6 +26,19 @@ bool matchLocation(const String& location, const char* name)
 	return *name == '\0' && *loc == '\0';
 }
 
+bool matchZone(const String& name, const FSTR::String& area, PGM_P location)
+{
+	auto arealen = area.length();
+	if(name.length() < arealen) {
+		return false;
+	}
+	auto nameptr = name.c_str();
+	if(!area.equalsIgnoreCase(nameptr, arealen)) {
+		return false;
+	}
+	return matchLocation(location, nameptr + arealen);
+}
+
 } // namespace
 
 namespace TZ
@@ -43,25 +56,186 @@ const Info& Info::empty()
 	return Empty::info;
 }
 
-const Info* findZone(const String& name)
+size_t TransitionTable::length() const
 {
-	auto namelen = name.length();
-	for(auto areaPair : areas) {
-		auto& area = areaPair.key();
-		auto arealen = area.length();
-		if(namelen < arealen) {
-			continue;
+	if(data.length() == 0) {
+		return 0;
+	}
+	Iterator it(*this, 0, 0);
+	return it.readVarint();
+}
+
+TransitionTable::Iterator::Iterator(const TransitionTable& table, unsigned index, unsigned count)
+	: table(&table), index(index), count(count), pos(0)
+{
+	if(index < count) {
+		// Skip over count
+		readVarint();
+		readNext();
+	}
+}
+
+uint64_t TransitionTable::Iterator::readVarint()
+{
+	uint64_t value{0};
+	for(unsigned shift = 0;; shift += 7) {
+		uint8_t c = table->data[pos++];
+		value |= uint64_t(c & 0x7f) << shift;
+		if((c & 0x80) == 0) {
+			return value;
 		}
-		auto nameptr = name.c_str();
-		if(!area.equalsIgnoreCase(nameptr, arealen)) {
-			continue;
+	}
+}
+
+void TransitionTable::Iterator::readNext()
+{
+	auto value = readVarint();
+	bool minutes = value & 1;
+	value >>= 1;
+	int64_t delta = int64_t(value >> 1) ^ -int64_t(value & 1);
+	if(minutes) {
+		delta *= 60;
+	}
+	auto type = table->types[table->data[pos++]];
+	transition.time = transition.time + delta;
+	transition.desigidx = type.desigidx;
+	transition.offsetMins = type.offsetMins;
+	transition.isdst = type.isdst;
+}
+
+bool HistoricalTimezone::seek(time_t time, bool local)
+{
+	if(count == 0) {
+		return false;
+	}
+
+	auto getKey = [&](const Transition& tt, int16_t prevOffsetMins) -> time_t {
+		return local ? tt.time + prevOffsetMins * SECS_PER_MIN : tt.time;
+	};
+
+	if(array) {
+		// Check whether transition is at or before the requested time
+		auto isBefore = [&](unsigned i) {
+			auto tt = (*array)[i];
+			return getKey(tt, i ? (*array)[i - 1].offsetMins : tt.offsetMins) <= time;
+		};
+
+		// Entries before `first` are at or before time, entries from `last` onwards are after it
+		unsigned first = 0;
+		unsigned last = count;
+		if(isBefore(index)) {
+			// Times in sequence usually fall within the current or next interval
+			first = index + 1;
+			if(first < count && isBefore(first)) {
+				++first;
+				if(first < count && !isBefore(first)) {
+					last = first;
+				}
+			} else {
+				last = first;
+			}
+		} else {
+			last = index;
 		}
-		nameptr += arealen;
-		for(auto& zone : areaPair.content()) {
-			if(matchLocation(zone.location, nameptr)) {
-				return &zone;
+		while(first < last) {
+			auto mid = (first + last) / 2;
+			if(isBefore(mid)) {
+				first = mid + 1;
+			} else {
+				last = mid;
 			}
 		}
+		if(first == 0) {
+			return false;
+		}
+		index = first - 1;
+		return index + 1 < count;
+	}
+
+	if(index == 0 || getKey(*iter, prevOffsetMins) > time) {
+		iter = table->begin();
+		index = 0;
+		prevOffsetMins = iter->offsetMins;
+		if(getKey(*iter, prevOffsetMins) > time) {
+			return false;
+		}
+	}
+	while(index + 1 < count) {
+		auto next = iter;
+		++next;
+		if(getKey(*next, iter->offsetMins) > time) {
+			break;
+		}
+		prevOffsetMins = iter->offsetMins;
+		iter = next;
+		++index;
+	}
+	return index + 1 < count;
+}
+
+DateTime::ZoneInfo HistoricalTimezone::getInfo(const Transition& tt) const
+{
+	return DateTime::ZoneInfo{
+		.tag = Rule::Tag::fromString(&tznames[tt.desigidx]),
+		.offsetMins = tt.offsetMins,
+		.isDst = tt.isdst,
+	};
+}
+
+ZonedTime HistoricalTimezone::makeZoned(time_t utc)
+{
+	if(!seek(utc, false)) {
+		return rules.makeZoned(utc);
+	}
+	return ZonedTime{utc, getInfo(current())};
+}
+
+ZonedTime HistoricalTimezone::toUTC(time_t local)
+{
+	if(!seek(local, true)) {
+		return rules.toUTC(local);
+	}
+	auto tt = current();
+	return ZonedTime{local - tt.offsetMins * SECS_PER_MIN, getInfo(tt)};
+}
+
+uint32_t getZoneNameHash(const char* name, size_t length)
+{
+	uint32_t hash = 0x811c9dc5;
+	for(; length != 0; --length, ++name) {
+		if(isalpha(*name)) {
+			hash ^= uint8_t(tolower(*name));
+			hash *= 0x01000193;
+		}
+	}
+	return hash;
+}
+
+const Info* findZone(const String& name)
+{
+	auto hash = getZoneNameHash(name.c_str(), name.length());
+
+	// Locate first entry with matching hash
+	unsigned first = 0;
+	unsigned last = zoneIndex.length();
+	while(first < last) {
+		auto mid = (first + last) / 2;
+		if(zoneIndex[mid].hash < hash) {
+			first = mid + 1;
+		} else {
+			last = mid;
+		}
+	}
+
+	// Confirm name matches in case of hash collision
+	for(; first < zoneIndex.length(); ++first) {
+		auto entry = zoneIndex[first];
+		if(entry.hash != hash) {
+			break;
+		}
+		if(matchZone(name, *entry.area, entry.info->location)) {
+			return entry.info;
+		}
 	}
 
 	return nullptr;
@@ -59,6 +59,47 @@ public:
 				CHECK(zone == t.info);
 			}
 		}
+
+		TEST_CASE("Zone index")
+		{
+			unsigned count{0};
+			for(auto area : TZ::areas) {
+				for(auto& zone : area.content()) {
+					CHECK(TZ::findZone(zone.name()) == &zone);
+					++count;
+				}
+			}
+			REQUIRE_EQ(count, TZ::zoneIndex.length());
+		}
+
+		TEST_CASE("Batch conversion")
+		{
+			auto& info = TZ::Europe::London::info;
+			DateTime dt;
+			dt.fromISO8601(F("2024-01-01"));
+			time_t newYear = dt;
+
+			// Alternate either side of new year to exercise year cache
+			time_t utc[64];
+			for(unsigned i = 0; i < ARRAY_SIZE(utc); ++i) {
+				time_t offset = time_t(i) * 5 * SECS_PER_DAY + 1;
+				utc[i] = (i % 2) ? newYear + offset : newYear - offset;
+			}
+
+			Timezone tz(info);
+			time_t local[ARRAY_SIZE(utc)];
+			tz.toLocal(utc, local, ARRAY_SIZE(utc));
+			time_t utc2[ARRAY_SIZE(utc)];
+			tz.toUTC(local, utc2, ARRAY_SIZE(utc));
+			for(unsigned i = 0; i < ARRAY_SIZE(utc); ++i) {
+				// Compare with fresh instance
+				Timezone ref(info);
+				CHECK_EQ(local[i], ref.toLocal(utc[i]));
+				CHECK_EQ(local[i], tz.toLocal(utc[i]));
+				CHECK_EQ(utc2[i], time_t(ref.toUTC(local[i])));
+				CHECK_EQ(utc2[i], utc[i]);
+			}
+		}
 	}
 };
 
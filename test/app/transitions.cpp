@@ -1,5 +1,35 @@
 #include "Common.h"
 
+namespace
+{
+using namespace TZ;
+
+// Selection of Europe/London transitions, as generated by compile.py with and without delta encoding
+DEFINE_FSTR_ARRAY_LOCAL(london_transitions, Transition,
+	{-3852662325, 8, 0, 0},	// 1847 Wed Dec 01 00:01:15 UTC
+	{-1691964000, 4, 60, 1}, // 1916 Sun May 21 02:00:00 UTC
+	{-1680472800, 8, 0, 0},	// 1916 Sun Oct 01 02:00:00 UTC
+	{1585443600, 4, 60, 1},	// 2020 Sun Mar 29 01:00:00 UTC
+	{1603587600, 8, 0, 0},	// 2020 Sun Oct 25 01:00:00 UTC
+	{1616893200, 4, 60, 1},	// 2021 Sun Mar 28 01:00:00 UTC
+	{1635642000, 8, 0, 0},	// 2021 Sun Oct 31 01:00:00 UTC
+	{1648342800, 4, 60, 1},	// 2022 Sun Mar 27 01:00:00 UTC
+	{1667091600, 8, 0, 0},	// 2022 Sun Oct 30 01:00:00 UTC
+)
+DEFINE_FSTR_ARRAY_LOCAL(london_timetypes, TimeType,
+	{0, 0, 8},	// GMT
+	{60, 1, 4}, // BST
+)
+DEFINE_FSTR_ARRAY_LOCAL(london_transition_data, uint8_t,
+	0x09, 0xd2, 0xb1, 0xaf, 0xb4, 0x39, 0x00, 0xd4, 0x9e, 0x9a, 0x99, 0x20, 0x01, 0x81, 0xe1, 0x2e,
+	0x00, 0x91, 0x86, 0xe9, 0x67, 0x01, 0x81, 0xea, 0x49, 0x00, 0x81, 0x92, 0x36, 0x01, 0x81, 0xa5,
+	0x4c, 0x00, 0x81, 0xd7, 0x33, 0x01, 0x81, 0xa5, 0x4c, 0x00,
+)
+TZ_DEFINE_TRANSITION_TABLE_LOCAL(london_table, london_timetypes, london_transition_data)
+TZ_DEFINE_PSTR_LOCAL(london_tznames, "LMT\0BST\0GMT\0BDST")
+
+} // namespace
+
 class TransitionsTest : public TestGroup
 {
 public:
@@ -9,6 +39,50 @@ public:
 
 	void execute() override
 	{
+		TEST_CASE("Delta-encoded table")
+		{
+			REQUIRE_EQ(london_table.length(), london_transitions.length());
+			unsigned i{0};
+			for(auto& tt : london_table) {
+				auto expected = london_transitions[i++];
+				CHECK_EQ(time_t(tt), time_t(expected));
+				CHECK_EQ(int(tt.desigidx), int(expected.desigidx));
+				CHECK_EQ(int(tt.offsetMins), int(expected.offsetMins));
+				CHECK_EQ(bool(tt.isdst), bool(expected.isdst));
+			}
+			CHECK_EQ(i, london_transitions.length());
+		}
+
+		TEST_CASE("Historical conversion using delta-encoded table")
+		{
+			auto rules = Timezone::fromPosix("GMT0BST,M3.5.0/1,M10.5.0");
+			TZ::HistoricalTimezone fromArray(rules, london_tznames, london_transitions);
+			TZ::HistoricalTimezone fromTable(rules, london_tznames, london_table);
+
+			auto check = [&](time_t utc) {
+				auto expected = fromArray.makeZoned(utc);
+				auto zoned = fromTable.makeZoned(utc);
+				CHECK_EQ(zoned.offsetMins(), expected.offsetMins());
+				CHECK_EQ(zoned.isDst(), expected.isDst());
+				auto local = expected.local();
+				CHECK_EQ(time_t(fromTable.toUTC(local)), time_t(fromArray.toUTC(local)));
+			};
+
+			// Forwards then backwards, so the table is re-scanned from the start
+			DateTime dt;
+			dt.fromISO8601(F("1910-01-01"));
+			time_t start = dt;
+			dt.fromISO8601(F("2025-01-01"));
+			time_t end = dt;
+			const time_t step = 5 * SECS_PER_DAY + 1;
+			for(time_t t = start; t < end; t += step) {
+				check(t);
+			}
+			for(time_t t = end; t > start; t -= step) {
+				check(t);
+			}
+		}
+
 #if TZINFO_WANT_TRANSITIONS
 		for(auto area : TZ::areas) {
 			for(auto& zone : area.content()) {
@@ -59,6 +133,30 @@ public:
 				}
 			}
 		}
+
+		TEST_CASE("Historical conversion")
+		{
+			for(auto area : TZ::areas) {
+				for(auto& zone : area.content()) {
+					if(zone.transitions.length() == 0) {
+						continue;
+					}
+
+					auto tz = zone.historical();
+					auto tt = zone.transitions.begin();
+					auto ttPrev = *tt++;
+					for(; tt != zone.transitions.end(); ttPrev = *tt, ++tt) {
+						// Interval from previous transition uses its offset
+						CHECK_EQ(tz.makeZoned(ttPrev).offsetMins(), ttPrev.offsetMins);
+						CHECK_EQ(tz.makeZoned(*tt - 1).offsetMins(), ttPrev.offsetMins);
+						time_t utc = ttPrev + (*tt - ttPrev) / 2;
+						auto local = tz.toLocal(utc);
+						CHECK_EQ(local, utc + ttPrev.offsetMins * SECS_PER_MIN);
+						CHECK_EQ(time_t(tz.toUTC(local)), utc);
+					}
+				}
+			}
+		}
 #endif // TZINFO_WANT_TRANSITIONS
 	}
 };
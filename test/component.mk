@@ -6,8 +6,17 @@ COMPONENT_DEPENDS := \
 HOST_NETWORK_OPTIONS := --nonet
 DISABLE_NETWORK := 1
 
+# Set to 1 to test delta-encoded transition tables
+CONFIG_VARS += TEST_TRANSITIONS_DELTA
+TEST_TRANSITIONS_DELTA ?= 0
+
 # Include transition data for verification
+ifeq ($(TEST_TRANSITIONS_DELTA),1)
+APP_TZDATA_OPTS := --name --tzstr --transitions-delta --from 2020 --to 2040 full
+APP_TZDATA_DIR := $(PROJECT_DIR)/out/Timezone-delta
+else
 APP_TZDATA_OPTS := --name --tzstr --transitions --from 2020 --to 2040 full
+endif
 
 .PHONY: execute
 execute: flash run
@@ -0,0 +1,221 @@
+"""
+Benchmark the zone compiler toolchain
+
+Each phase is run over one or more zoneinfo databases and timed.
+Peak memory is measured in a separate run using tracemalloc, so it does not distort the timings.
+
+By default the installed system database is used, together with the `tzdata` python package if installed.
+The latter provides a reproducible snapshot: see `requirements-bench.txt` for the pinned version.
+
+Examples:
+
+    # Run and save results
+    python bench.py --output results.json
+
+    # Check for regressions against saved results
+    python bench.py --baseline results.json --threshold 0.2
+
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+from argparse import ArgumentParser
+import tzdb
+import compile
+import tzzi
+from tzdb import ZoneList, get_zoneinfo_version
+from tzif import TzFile
+from tzstr import decode_tzstr
+
+# Number of lookups for find_matches phase
+MATCH_COUNT = 200
+
+
+def get_snapshot_path() -> str:
+    """Path to zoneinfo in the tzdata package, if installed"""
+    try:
+        from importlib import resources
+        return str(resources.files('tzdata').joinpath('zoneinfo'))
+    except (ImportError, ModuleNotFoundError, AttributeError):
+        return None
+
+
+def get_phases(zoneinfo_path: str) -> list:
+    """Return list of (name, unit, function) for each phase.
+    Each function returns the number of items processed.
+    Phases run in order, later phases use results from earlier ones.
+    """
+    state = {}
+
+    def zonelist():
+        state['zones'] = ZoneList(zoneinfo_path)
+        return len(state['zones'])
+
+    def tzif_parse():
+        state['tzfiles'] = [TzFile(os.path.join(zoneinfo_path, zone), fast=True) for zone in state['zones']]
+        return len(state['tzfiles'])
+
+    def tzif_parse_full():
+        for zone in state['zones']:
+            TzFile(os.path.join(zoneinfo_path, zone))
+        return len(state['zones'])
+
+    def zi_compile():
+        # Independent of other phases: parse tzdata.zi then compile every zone
+        db = tzzi.load(zoneinfo_path)
+        for zone in state['zones']:
+            db.compile(zone)
+        return len(state['zones'])
+
+    def tzstr_decode():
+        state['rules'] = [decode_tzstr(tzfile.tzstr) for tzfile in state['tzfiles']]
+        return len(state['rules'])
+
+    def find_matches():
+        zones = state['zones']
+        step = max(1, len(zones) // MATCH_COUNT)
+        queries = [zone.lower()[:len(zone) // 2] for zone in zones[::step]]
+        for q in queries:
+            zones.find_matches(q)
+        return len(queries)
+
+    def get_transitions():
+        state['transitions'] = [compile.get_transitions(tzfile) for tzfile in state['tzfiles']]
+        return sum(len(t) for t in state['transitions'])
+
+    def write_zones():
+        zoneinfo = {
+            zone: compile.TimezoneInfo(zone, tzfile.tzstr, rules, tzfile.info[-1], tzfile.info[-1].tznames, transitions if rules.dst else None)
+            for zone, tzfile, rules, transitions in zip(state['zones'], state['tzfiles'], state['rules'], state['transitions'])}
+        names = list(zoneinfo)
+        compile.write_zones(names, (zoneinfo[name] for name in compile.get_output_order(names)), io.StringIO(), io.StringIO())
+        return len(zoneinfo)
+
+    return [
+        ('zonelist', 'zones', zonelist),
+        ('tzif_parse', 'zones', tzif_parse),
+        ('tzif_parse_full', 'zones', tzif_parse_full),
+        ('zi_compile', 'zones', zi_compile),
+        ('tzstr_decode', 'zones', tzstr_decode),
+        ('find_matches', 'queries', find_matches),
+        ('get_transitions', 'transitions', get_transitions),
+        ('write_zones', 'zones', write_zones),
+    ]
+
+
+def clear_caches():
+    """Discard memoised results so phases are measured doing their full work"""
+    decode_tzstr.cache_clear()
+
+
+def run_source(zoneinfo_path: str, repeat: int) -> dict:
+    tzdb.ZONEINFO_PATH = zoneinfo_path
+    results = {}
+
+    # Timing runs, take the best
+    for _ in range(repeat):
+        for name, unit, func in get_phases(zoneinfo_path):
+            clear_caches()
+            t = time.perf_counter()
+            count = func()
+            elapsed = time.perf_counter() - t
+            res = results.get(name)
+            if res is None or elapsed < res['wall']:
+                results[name] = {
+                    'wall': elapsed,
+                    'count': count,
+                    'unit': unit,
+                    'rate': count / elapsed if elapsed else 0,
+                }
+
+    # Memory run
+    for name, unit, func in get_phases(zoneinfo_path):
+        clear_caches()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name]['peak_kb'] = round(peak / 1024, 1)
+
+    return {
+        'path': zoneinfo_path,
+        'version': get_zoneinfo_version(zoneinfo_path),
+        'phases': results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return list of regressions"""
+    regressions = []
+    for label, source in results['sources'].items():
+        base_source = baseline['sources'].get(label)
+        if not base_source:
+            continue
+        for name, res in source['phases'].items():
+            base = base_source['phases'].get(name)
+            if not base:
+                continue
+            ratio = res['wall'] / base['wall'] if base['wall'] else 1
+            if ratio > 1 + threshold:
+                regressions.append(f'{label} {name}: {res["wall"]*1000:.2f}ms vs {base["wall"]*1000:.2f}ms ({ratio:.2f}x)')
+    return regressions
+
+
+def print_results(results: dict):
+    for label, source in results['sources'].items():
+        print(f'\n{label}: {source["path"]} ({source["version"]})')
+        print(f'  {"Phase":20} {"Time (ms)":>10} {"Peak (KB)":>10} {"Rate":>12}')
+        for name, res in source['phases'].items():
+            print(f'  {name:20} {res["wall"]*1000:10.2f} {res["peak_kb"]:10.1f} {res["rate"]:10.0f} {res["unit"]}/s')
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark zone compiler toolchain')
+    parser.add_argument('--source', action='append', help='Path to compiled zoneinfo (may be given more than once)')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timing runs, best is reported')
+    parser.add_argument('--output', help='Write results to JSON file')
+    parser.add_argument('--baseline', help='Compare against results from JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Fractional slowdown which counts as a regression')
+    args = parser.parse_args()
+
+    if args.source:
+        sources = {f'source{i+1}': path for i, path in enumerate(args.source)}
+    else:
+        sources = {'system': tzdb.get_zoneinfo_path()}
+        snapshot = get_snapshot_path()
+        if snapshot and os.path.isdir(snapshot):
+            sources['snapshot'] = snapshot
+
+    # Options used by compile.get_transitions and compile.write_zones
+    compile.args = compile.get_parser().parse_args(['--name', '--tzstr', '--transitions'])
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sources': {label: run_source(path, args.repeat) for label, path in sources.items()},
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\nREGRESSIONS:')
+            print('\n'.join(f'  {r}' for r in regressions))
+            sys.exit(1)
+        print('\nNo regressions')
+
+
+if __name__ == '__main__':
+    main()
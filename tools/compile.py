@@ -6,13 +6,22 @@ from __future__ import annotations
 import os
 import io
 import sys
-import struct
-from tzdb import ZONE_AREAS, ZoneList, get_zoneinfo_path, get_zoneinfo_version
-from tzif import TzFile, TzInfo
+import filecmp
+import itertools
+import time
+from tzdb import TZDATA_ZI, ZONE_AREAS, ZoneList, get_zone_hash, get_zoneinfo_path, get_zoneinfo_version
+from tzif import TzFile, TzInfo, Transition
 from tzstr import Rule, RulePair, decode_tzstr
-from dataclasses import dataclass
-from datetime import datetime, timezone
+from dataclasses import dataclass, replace
+from collections import Counter
+from functools import lru_cache, partial, wraps
+from collections.abc import Iterable, Iterator
 from argparse import ArgumentParser
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tzverify
+    import tzzi
 
 global args
 
@@ -21,6 +30,7 @@ MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'O
 DAY_NAMES = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
 
 def get_timestr(time: int):
+    from datetime import datetime, timezone
     DATETIMEFMT = '%Y %a %b %d %H:%M:%S'
     dt = datetime.fromtimestamp(time, tz=timezone.utc)
     return dt.strftime(DATETIMEFMT)
@@ -48,30 +58,52 @@ def get_rule_def(rule: Rule) -> str:
     return ", ".join(values)
 
 
-@dataclass
-class Transition:
-    time: int
-    desigidx: int
-    offset: int
-    isdst: bool
-
-    def pack(self) -> bytes:
-        packed_time = struct.pack('<q', self.time)
-        return struct.pack('<hb', (self.offset << 1) | self.isdst, self.desigidx) + packed_time[:5]
-
-    @staticmethod
-    def unpack(data: bytes) -> Transition:
-        offset, desigidx = struct.unpack('<hb', data[:3])
-        # Sign extend
-        packed_time = data[3:] + (b'\xff\xff' if data[7] & 0x80 else b'\x00\x00')
-        time, = struct.unpack('<q', packed_time)
-        return Transition(time, desigidx, offset >> 1, bool(offset & 1))
+# Size of a TZ::Transition structure
+TRANSITION_SIZE = 8
+# Size of TZ::TimeType and TZ::TransitionTable structures
+TIMETYPE_SIZE = 4
+TRANSITION_TABLE_SIZE = 8
+# FSTR::Array objects have a 32-bit length header, content padded to 4 bytes
+FSTR_HEADER_SIZE = 4
+
+# Flash estimates for generated data, for 32-bit targets
+POINTER_SIZE = 4
+# TZ::Rule, with 8-byte tag
+RULE_SIZE = 16
+# TZ::ZoneIndexEntry
+ZONE_INDEX_ENTRY_SIZE = 12
+
+# Build cache stored alongside generated files
+CACHE_FILENAME = 'tzdata.cache.json'
+CACHE_FORMAT = 2
+# Changes to these invalidate the cache
+CACHE_GENERATORS = ['compile.py', 'tzdb.py', 'tzif.py', 'tzstr.py', 'tzzi.py']
+
+
+def get_time_range(first_year: int, last_year: int) -> tuple[int, int]:
+    """Range of transition times included for the given years"""
+    from datetime import datetime, timezone
+    time_from = int(datetime(first_year, 1, 1, tzinfo=timezone.utc).timestamp())
+    time_to = int(datetime(last_year, 12, 31, tzinfo=timezone.utc).timestamp())
+    return time_from, time_to
+
+
+def select_transitions(transitions: list[Transition], time_from: int, time_to: int) -> list[Transition]:
+    """Reduce a list of transitions to a smaller time range, as for `get_transitions`.
+    The transition in effect at `time_from` is retained.
+    """
+    res = []
+    for t in transitions:
+        if t.time > time_to:
+            break
+        if t.time < time_from:
+            res = []
+        res.append(t)
+    return res
 
 
 def get_transitions(tzfile: TzFile) -> list[Transition]:
-    from_ = getattr(args, 'from')
-    time_from = int(datetime(from_, 1, 1, tzinfo=timezone.utc).timestamp())
-    time_to = int(datetime(args.to, 12, 31, tzinfo=timezone.utc).timestamp())
+    time_from, time_to = get_time_range(getattr(args, 'from'), args.to)
 
     info = tzfile.info[-1]
 
@@ -104,6 +136,52 @@ def get_transitions(tzfile: TzFile) -> list[Transition]:
     return res
 
 
+def encode_varint(value: int) -> bytes:
+    res = bytearray()
+    while value >= 0x80:
+        res.append(0x80 | (value & 0x7f))
+        value >>= 7
+    res.append(value)
+    return bytes(res)
+
+
+def encode_transitions(transitions: list[Transition]) -> tuple[list[tuple], bytes]:
+    """Encode transitions for a `TZ::TransitionTable`.
+    Returns list of (offset, isdst, desigidx) time types and the encoded data.
+
+    Data starts with the number of transitions, followed by an entry for each one:
+    the time difference from the previous transition then the index of its time type.
+    Time differences are zigzag-encoded varints, with bit 0 set if the value is in minutes.
+    """
+    types = []
+    data = bytearray(encode_varint(len(transitions)))
+    prev_time = 0
+    for t in transitions:
+        tt = (t.offset, t.isdst, t.desigidx)
+        if tt not in types:
+            types.append(tt)
+        delta = t.time - prev_time
+        prev_time = t.time
+        minutes, seconds = divmod(delta, 60)
+        value = (minutes, 1) if seconds == 0 else (delta, 0)
+        zigzag = value[0] * 2 if value[0] >= 0 else -value[0] * 2 - 1
+        data += encode_varint(zigzag << 1 | value[1])
+        data.append(types.index(tt))
+    return types, bytes(data)
+
+
+def get_fstr_array_size(count: int, item_size: int) -> int:
+    return FSTR_HEADER_SIZE + (count * item_size + 3) // 4 * 4
+
+
+def get_transitions_size(transitions: list[Transition], encoding: str) -> int:
+    """Flash required for transition table"""
+    if encoding == 'delta':
+        types, data = encode_transitions(transitions)
+        return TRANSITION_TABLE_SIZE + get_fstr_array_size(len(types), TIMETYPE_SIZE) + get_fstr_array_size(len(data), 1)
+    return get_fstr_array_size(len(transitions), TRANSITION_SIZE)
+
+
 def get_namespace(s: str):
     return s.translate(str.maketrans({'/': '::', '-': '_'}))
 
@@ -119,10 +197,12 @@ class TimezoneInfo:
     name: str
     tzstr: str
     rules: RulePair
-    info: TzInfo
+    info: TzInfo = None
+    tznames: bytes = b''
     transitions: list[Transition] = None
     tzstr_alias: str = None
     transitions_alias: str = None 
+    link: str = None # Zone this shares source data with
 
     @property
     def area(self):
@@ -132,15 +212,249 @@ class TimezoneInfo:
     def location(self):
         return self.name.partition('/')[2]
 
+    @property
+    def nsname(self):
+        return get_nsname(self.name)
+
+
+def get_nsname(name: str) -> str:
+    """Zones are written to the header grouped by this namespace"""
+    return name.rpartition('/')[0]
+
+
+def get_output_order(names: list[str]) -> list[str]:
+    """Order in which zones are written to the header. Sort is stable so list order is kept within each namespace."""
+    return sorted(names, key=get_nsname)
+
+
+# Compact database source, loaded on first use
+zi_database = None
+
+
+def get_zi_database() -> tzzi.ZiDatabase:
+    global zi_database
+    if zi_database is None:
+        import tzzi
+        zi_database = tzzi.load(get_zoneinfo_path())
+    return zi_database
+
+
+def get_source_filename(zone: str) -> str:
+    """File containing source data for a zone"""
+    if args.source_format == 'zi':
+        return os.path.join(get_zoneinfo_path(), TZDATA_ZI)
+    return os.path.join(get_zoneinfo_path(), zone)
+
+
+def load_tzfile(zone: str) -> TzFile:
+    if args.source_format == 'zi':
+        return get_zi_database().compile(zone, args.zi_bloat == 'fat')
+    return TzFile(os.path.join(get_zoneinfo_path(), zone), fast=True)
+
 
 def get_info(zone: str) -> TimezoneInfo:
-    tzfile = TzFile(os.path.join(get_zoneinfo_path(), zone))
+    tzfile = load_tzfile(zone)
     try:
         rules = decode_tzstr(tzfile.tzstr)
     except:
         raise ValueError(f'Invalid TZ string "{tzfile.tzstr}"')
     transitions = get_transitions(tzfile) if rules.dst else None
-    return TimezoneInfo(zone, tzfile.tzstr, rules, tzfile.info[-1], transitions)
+    info = tzfile.info[-1]
+    return TimezoneInfo(zone, tzfile.tzstr, rules, info, info.tznames, transitions)
+
+
+# File details from the most recent zone list, used to identify linked zones
+zone_entries = {}
+
+
+def get_zone_list() -> ZoneList:
+    global zone_entries
+    if args.source_format == 'zi':
+        db = get_zi_database()
+        names = [name for name in db.names() if name.partition('/')[0] in ZONE_AREAS]
+        return ZoneList.from_names(names, db.version)
+    zone_list = ZoneList(cache_file=args.zone_index)
+    zone_entries = zone_list.entries
+    return zone_list
+
+
+def get_zone_links(zones: list[str]) -> dict[str, str]:
+    """Map each zone to the first zone in the list with the same source data.
+    TZif files are identified by device and inode so links are found without reading them.
+    Where these aren't available (e.g. Windows) a hash of the file content is used instead.
+    """
+    def get_key(zone: str):
+        if args.source_format == 'zi':
+            return get_zi_database().resolve(zone)
+        entry = zone_entries.get(zone)
+        if entry and entry.inode:
+            return entry.device, entry.inode
+        return get_file_hash(get_source_filename(zone))
+
+    if len(zones) < 2:
+        return {zone: zone for zone in zones}
+    targets = {}
+    return {zone: targets.setdefault(get_key(zone), zone) for zone in zones}
+
+
+# Functions timed for each phase with --stats
+STATS_PHASES = {
+    'scan': 'get_zone_list',
+    'parse': 'load_tzfile',
+    'decode': 'decode_tzstr',
+    'transitions': 'get_transitions',
+    'dedup': 'AliasResolver.resolve',
+    'emit': 'write_zone',
+}
+
+
+class Stats:
+    """Phase timers, counters and size estimates recorded with --stats.
+    Timers are only installed when enabled so cost nothing otherwise.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {phase: [0.0, 0] for phase in STATS_PHASES}
+        self.counts = {'zones': 0, 'tzstr_aliases': 0, 'transition_aliases': 0, 'transitions': 0}
+        self.zones = {}
+
+    def install(self):
+        """Replace functions with timed versions"""
+        g = globals()
+        for phase, path in STATS_PHASES.items():
+            owner_name, _, name = path.rpartition('.')
+            if owner_name:
+                owner = g[owner_name]
+                setattr(owner, name, self.timed(phase, getattr(owner, name)))
+            else:
+                g[name] = self.timed(phase, g[name])
+
+    def timed(self, phase: str, func):
+        entry = self.phases[phase]
+        perf_counter = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            t = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry[0] += perf_counter() - t
+                entry[1] += 1
+        return wrapper
+
+    def reset_phases(self):
+        for entry in self.phases.values():
+            entry[:] = [0.0, 0]
+
+    def merge_phases(self, phases: dict):
+        """Add times from a worker process"""
+        for phase, (secs, calls) in phases.items():
+            entry = self.phases[phase]
+            entry[0] += secs
+            entry[1] += calls
+
+    def add_zone(self, zone: TimezoneInfo):
+        """Record details of a zone as written"""
+        self.counts['zones'] += 1
+        self.counts['tzstr_aliases'] += bool(zone.tzstr_alias)
+        self.counts['transition_aliases'] += bool(zone.transitions_alias)
+        self.counts['transitions'] += len(zone.transitions or [])
+        self.zones[zone.name] = estimate_zone_size(zone)
+
+    def write(self, filename: str):
+        areas = {}
+        for name, size in self.zones.items():
+            area = name.partition('/')[0]
+            areas[area] = areas.get(area, get_area_overhead(area)) + sum(size.values())
+        result = {
+            'source': get_zoneinfo_path(),
+            'version': get_zoneinfo_version(),
+            'command': args.func.__name__ if args.func else None,
+            'total_time': time.perf_counter() - self.start,
+            'phases': {phase: {'time': secs, 'calls': calls} for phase, (secs, calls) in self.phases.items()},
+            'counts': self.counts,
+            'flash': {
+                'total': sum(areas.values()),
+                'areas': areas,
+                'zones': {name: dict(size, total=sum(size.values())) for name, size in self.zones.items()},
+            },
+        }
+        import json
+        with open(filename, 'w') as f:
+            json.dump(result, f, indent=1)
+
+
+# Statistics are only collected if --stats is given
+stats = None
+
+
+def init_worker(worker_args, zoneinfo_path: str):
+    """Worker processes don't inherit our globals on all platforms, so set them explicitly"""
+    import tzdb
+    global args, stats
+    args = worker_args
+    tzdb.ZONEINFO_PATH = zoneinfo_path
+    # Forked workers already have timers installed
+    if args.stats and stats is None:
+        stats = Stats()
+        stats.install()
+
+
+def call_with_stats(func, zone: str):
+    """Call function in worker process, also returning time spent in each phase"""
+    stats.reset_phases()
+    res = func(zone)
+    return res, {phase: tuple(entry) for phase, entry in stats.phases.items()}
+
+
+def map_zones(func, zones: list[str]) -> Iterator:
+    """Call function for each zone, using a process pool if requested.
+    Results are always yielded in the same order as the zone list,
+    as soon as they are available so consumers can run alongside the workers.
+    """
+    jobs = args.jobs or os.cpu_count()
+    if jobs <= 1 or len(zones) < 2:
+        yield from (func(zone) for zone in zones)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    chunksize = max(1, len(zones) // (jobs * 4))
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(args, get_zoneinfo_path())) as executor:
+        if not stats:
+            yield from executor.map(func, zones, chunksize=chunksize)
+            return
+        for res, phases in executor.map(partial(call_with_stats, func), zones, chunksize=chunksize):
+            stats.merge_phases(phases)
+            yield res
+
+
+def iter_zoneinfo(zones: list[str]) -> Iterator[TimezoneInfo]:
+    """Parse zones, in list order.
+    Zones with the same source data are only parsed once: the others share the result, with `link` set.
+    """
+    links = get_zone_links(zones)
+    remaining = Counter(links.values())
+    results = map_zones(get_info, list(remaining))
+    parsed = {}
+    try:
+        for zone in zones:
+            target = links[zone]
+            if target == zone:
+                info = next(results)
+                if remaining[target] > 1:
+                    parsed[target] = info
+            else:
+                info = replace(parsed[target], name=zone, link=target)
+            remaining[target] -= 1
+            if not remaining[target]:
+                parsed.pop(target, None)
+            yield info
+    finally:
+        results.close()
+
+
+def get_zoneinfo(zones: list[str]) -> list[TimezoneInfo]:
+    return list(iter_zoneinfo(zones))
 
 
 def write_zone(fp, zone: TimezoneInfo):
@@ -164,11 +478,26 @@ def write_zone(fp, zone: TimezoneInfo):
     else:
         lines.append('DEFINE_REF_LOCAL(dst_rule, rule_none)')
 
-    s = zone.info.tznames.decode()[:-1]
+    s = zone.tznames.decode()[:-1]
     s = s.replace('\0', '\\0')
     lines.append(f'TZ_DEFINE_PSTR_LOCAL(tznames, "{s}")')
 
-    if args.transitions and zone.transitions and not zone.transitions_alias:
+    if args.transitions == 'delta' and zone.transitions and not zone.transitions_alias:
+        types, data = encode_transitions(zone.transitions)
+        size = get_transitions_size(zone.transitions, 'delta')
+        full_size = get_transitions_size(zone.transitions, 'full')
+        lines.append(f'// {len(zone.transitions)} transitions, {size} bytes (saves {full_size - size})')
+        lines.append('DEFINE_FSTR_ARRAY_LOCAL(timetypes, TimeType,')
+        for offset, isdst, desigidx in types:
+            tzname = zone.tznames[desigidx:zone.tznames.index(0, desigidx)].decode()
+            lines.append(f'\t{{{offset}, {int(isdst)}, {desigidx}}},\t// {tzname}')
+        lines.append(')')
+        lines.append('DEFINE_FSTR_ARRAY_LOCAL(transition_data, uint8_t,')
+        for i in range(0, len(data), 16):
+            lines.append('\t' + ' '.join(f'{c:#04x},' for c in data[i:i+16]))
+        lines.append(')')
+        lines.append('TZ_DEFINE_TRANSITION_TABLE_LOCAL(transitions, timetypes, transition_data)')
+    elif args.transitions and zone.transitions and not zone.transitions_alias:
         lines.append('DEFINE_FSTR_ARRAY_LOCAL(transitions, Transition,')
         for transition in zone.transitions:
             lines.append(f'\t{{{transition.time}, {transition.desigidx}, {transition.offset}, {int(transition.isdst)}}},\t// {get_timestr(transition.time)} UTC')
@@ -177,42 +506,261 @@ def write_zone(fp, zone: TimezoneInfo):
         alias = f'{get_namespace(zone.transitions_alias)}::transitions' if zone.transitions_alias else 'transitions_none'
         lines.append(f'DEFINE_REF_LOCAL(transitions, {alias})')
 
-    fp.write(f'\n{ns_begin}TIMEZONE_BEGIN({clsname}, "{zone.area}", "{zone.location}")\n')
-    for line in lines:
-        fp.write(f'\t{line}\n')
-    fp.write(f'TIMEZONE_END()\n{ns_end}')
+    body = ''.join(f'\t{line}\n' for line in lines)
+    fp.write(f'\n{ns_begin}TIMEZONE_BEGIN({clsname}, "{zone.area}", "{zone.location}")\n{body}TIMEZONE_END()\n{ns_end}')
+
+
+def get_transitions_digest(transitions: list[Transition]) -> bytes:
+    import hashlib
+    return hashlib.sha1(b''.join(t.pack() for t in transitions)).digest()
+
+
+class AliasResolver:
+    """Set tzstr and transition aliases to the first zone (in output order) with identical content.
+    Only zone names are retained so zones can be resolved one at a time as they are generated.
+    With `per_area` set, aliases only refer to zones in the same area.
+    """
+    def __init__(self, per_area: bool = False):
+        self.per_area = per_area
+        self.tzstr_index = {}
+        self.transitions_index = {}
+        # Alias targets for each zone, used directly for linked zones
+        self.targets = {}
+        # Estimated number of bytes saved
+        self.saved = 0
+
+    @staticmethod
+    def get_alias(zone: TimezoneInfo, target: str):
+        return target.partition('/')[2] if zone.nsname == get_nsname(target) else target
+
+    def resolve(self, zone: TimezoneInfo):
+        zone.tzstr_alias = zone.transitions_alias = None
+        targets = self.targets.get(zone.link)
+        if targets is None or bool(targets[1]) != bool(zone.transitions) or not self.in_area(zone, targets):
+            targets = self.find_targets(zone)
+        self.targets[zone.name] = targets
+        tzstr_target, transitions_target = targets
+        if tzstr_target != zone.name:
+            zone.tzstr_alias = self.get_alias(zone, tzstr_target)
+            self.saved += len(zone.tzstr) + 1
+        if transitions_target and transitions_target != zone.name:
+            zone.transitions_alias = self.get_alias(zone, transitions_target)
+            if args.transitions:
+                self.saved += get_transitions_size(zone.transitions, args.transitions)
+
+    def in_area(self, zone: TimezoneInfo, targets: tuple[str, str]) -> bool:
+        """Check targets may be used for zone"""
+        return not self.per_area or all(t.partition('/')[0] == zone.area for t in targets if t)
+
+    def find_targets(self, zone: TimezoneInfo) -> tuple[str, str]:
+        """Find first zones with same rules and transitions"""
+        area = zone.area if self.per_area else None
+        tzstr_target = self.tzstr_index.setdefault((area, zone.tzstr), zone.name)
+        if not zone.transitions:
+            return tzstr_target, None
+        digest = get_transitions_digest(zone.transitions)
+        return tzstr_target, self.transitions_index.setdefault((area, digest), zone.name)
+
+
+@lru_cache(maxsize=None)
+def get_file_hash(filename: str) -> str:
+    import hashlib
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def get_generator_hash() -> str:
+    import hashlib
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha1()
+    for name in CACHE_GENERATORS:
+        h.update(bytes.fromhex(get_file_hash(os.path.join(tools_dir, name))))
+    return h.hexdigest()
+
+
+def get_cache_key() -> dict:
+    """Everything which affects generated output, other than the zone files themselves"""
+    return {
+        'format': CACHE_FORMAT,
+        'generator': get_generator_hash(),
+        'source': get_zoneinfo_path(),
+        'version': get_zoneinfo_version(),
+        'options': {
+            'name': args.name,
+            'tzstr': args.tzstr,
+            'rule': args.rule,
+            'transitions': args.transitions,
+            'source_format': args.source_format,
+            'zi_bloat': args.zi_bloat,
+            'from': getattr(args, 'from'),
+            'to': args.to,
+            'split': args.split,
+        },
+    }
+
+
+def load_cache(filename: str) -> dict:
+    import json
+    try:
+        with open(filename) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if cache.get('key') == get_cache_key() else {}
+
+
+def zone_to_cache(zone: TimezoneInfo) -> dict:
+    return {
+        'tzstr': zone.tzstr,
+        'tznames': zone.tznames.decode('latin-1'),
+        'transitions': [[t.time, t.desigidx, t.offset, int(t.isdst)] for t in zone.transitions] if zone.transitions is not None else None,
+    }
+
+
+def zone_from_cache(name: str, entry: dict) -> TimezoneInfo:
+    transitions = entry['transitions']
+    if transitions is not None:
+        transitions = [Transition(t[0], t[1], t[2], bool(t[3])) for t in transitions]
+    tzstr = entry['tzstr']
+    return TimezoneInfo(name, tzstr, decode_tzstr(tzstr), None, entry['tznames'].encode('latin-1'), transitions)
+
+
+def get_output_stat(filenames: list[str]) -> list:
+    try:
+        return [[st.st_mtime_ns, st.st_size] for st in (os.stat(f) for f in filenames)]
+    except FileNotFoundError:
+        return None
+
+
+# Generated files are large, so use a bigger write buffer than the default
+OUTPUT_BUFFER_SIZE = 0x40000
+
+
+class OutputFile:
+    """Write to a temporary file, replacing target only if content has changed so timestamp is preserved otherwise"""
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.tmpname = filename + '.tmp'
+        self.fp = None
+
+    def __enter__(self):
+        self.fp = open(self.tmpname, 'w', buffering=OUTPUT_BUFFER_SIZE)
+        return self.fp
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.fp.close()
+        if exc_type is None and not (os.path.exists(self.filename) and filecmp.cmp(self.tmpname, self.filename, shallow=False)):
+            os.replace(self.tmpname, self.filename)
+        else:
+            os.remove(self.tmpname)
+
+
+def get_output_zone(zone: TimezoneInfo) -> TimezoneInfo:
+    """Drop transitions if they're not written, so they aren't cached"""
+    return zone if args.transitions else replace(zone, transitions=None)
+
+
+def save_cache(filename: str, zones: dict, output_files: list[str]):
+    import json
+    cache = {
+        'key': get_cache_key(),
+        'output': get_output_stat(output_files),
+        'zones': zones,
+    }
+    with open(filename, 'w') as f:
+        json.dump(cache, f)
 
 
 def write_zones_full():
-    header = open(os.path.join(args.output, 'tzdata.h'), 'w')
-    source = open(os.path.join(args.output, 'tzdata.cpp'), 'w')
+    if not args.cache:
+        names = list(get_zone_list())
+        write_output(names, map(get_output_zone, iter_zoneinfo(get_output_order(names))))
+        return
 
-    zoneinfo = [get_info(name) for name in ZoneList()]
-    write_zones(zoneinfo, header, source)
+    cache_file = os.path.join(args.output, CACHE_FILENAME)
+    cache = load_cache(cache_file)
+
+    # Re-use cached entries for unchanged zone files
+    cached_zones = cache.get('zones', {})
+    zones = {}
+    changed = []
+    touched = False
+    for name in get_zone_list():
+        st = os.stat(get_source_filename(name))
+        entry = cached_zones.get(name)
+        if entry and (entry['mtime'], entry['size']) != (st.st_mtime_ns, st.st_size):
+            # Timestamp may change without content changing, e.g. package re-installed
+            if entry['size'] == st.st_size and entry['hash'] == get_file_hash(get_source_filename(name)):
+                entry = dict(entry, mtime=st.st_mtime_ns)
+                touched = True
+            else:
+                entry = None
+        if entry:
+            zones[name] = entry
+        else:
+            zones[name] = {'mtime': st.st_mtime_ns, 'size': st.st_size}
+            changed.append(name)
+
+    output_files = get_output_files(list(zones))
+    if not changed and zones.keys() == cached_zones.keys() and cache.get('output') == get_output_stat(output_files):
+        if touched:
+            # Save new timestamps so files aren't checked again
+            save_cache(cache_file, zones, output_files)
+        print('Timezone data is up to date', file=sys.stderr)
+        return
 
+    # Changed zones are parsed in output order, alongside generation
+    names = list(zones)
+    output_order = get_output_order(names)
+    changed = set(changed)
+    parsed = iter_zoneinfo([name for name in output_order if name in changed])
+
+    def get_zones():
+        for name in output_order:
+            entry = zones[name]
+            if name not in changed:
+                yield zone_from_cache(name, entry)
+                continue
+            zone = get_output_zone(next(parsed))
+            entry['hash'] = get_file_hash(get_source_filename(name))
+            entry.update(zone_to_cache(zone))
+            yield zone
+        parsed.close()
 
-def write_zones(zoneinfo: list[TimezoneInfo], header, source):
-    ver = get_zoneinfo_version()
-    ver_major = int(ver[:4])
-    ver_minor = 1 + ord(ver[4]) - ord('a')
+    write_output(names, get_zones())
+    save_cache(cache_file, zones, output_files)
 
-    intro = f'''\
+
+def get_areas(names: list[str]) -> list[str]:
+    return sorted({get_nsname(name).partition('/')[0] for name in names})
+
+
+def get_output_intro(names: list[str]) -> str:
+    return f'''\
 /*
  *
  * IANA timezone database. Auto-generated file.
  *
  * source:  {get_zoneinfo_path()}
- * version: {ver}
+ * version: {get_zoneinfo_version()}
  *
- * {len(zoneinfo)} zones.
+ * {len(names)} zones.
  */
 '''
 
-    header.write(intro + f'''
+
+def write_header_config(header, areas: list[str]):
+    """Write options, version and declarations for each area. Leaves TZ namespace open."""
+    ver = get_zoneinfo_version()
+    ver_major = int(ver[:4])
+    ver_minor = 1 + ord(ver[4]) - ord('a')
+
+    header.write(f'''
 #define TZINFO_WANT_NAME  {int(args.name)}
 #define TZINFO_WANT_TZSTR {int(args.tzstr)}
 #define TZINFO_WANT_RULES {int(args.rule)}
-#define TZINFO_WANT_TRANSITIONS {int(args.transitions)}
+#define TZINFO_WANT_TRANSITIONS {int(bool(args.transitions))}
+#define TZINFO_TRANSITIONS_DELTA {int(args.transitions == 'delta')}
 
 #include <tzdb.h>
 
@@ -227,23 +775,7 @@ def write_zones(zoneinfo: list[TimezoneInfo], header, source):
 namespace TZ {{
 ''')
 
-    # Build list of namespaces
-    for zone in zoneinfo:
-        zone.nsname = zone.name.rpartition('/')[0]
-    nsnames = set(z.nsname for z in zoneinfo)
-
-    # De-duplicate entries
-    sorted_zones = sorted(zoneinfo, key=lambda z: z.nsname)
-    for i, zone in enumerate(sorted_zones):
-        for z2 in sorted_zones[i+1:]:
-            alias = zone.location if z2.nsname == zone.nsname else zone.name
-            if not z2.tzstr_alias and zone.tzstr == z2.tzstr:
-                z2.tzstr_alias = alias
-            if zone.transitions and not z2.transitions_alias and zone.transitions == z2.transitions:
-                z2.transitions_alias = alias
-
     header.write('\n/* AREAS */\n')
-    areas = sorted({n.partition('/')[0] for n in nsnames})
     for area in areas:
         header.write(f'''
 namespace {area} {{
@@ -251,21 +783,95 @@ DEFINE_FSTR_LOCAL(area, "{area}")
 DECLARE_FSTR_VECTOR(zones, Info)
 }}''')
 
-    header.write('\n\n/* ZONES */\n')
 
-    for nsname in sorted(nsnames):
-        ns = get_namespace(nsname)
-        header.write(f'''
+class ZoneWriter:
+    """Write zone classes as they are produced, de-duplicating as we go"""
+    def __init__(self, per_area: bool = False):
+        self.resolver = AliasResolver(per_area)
+        self.delta_saved = 0
+
+    def write_area(self, fp, zones: Iterable[TimezoneInfo]):
+        """Write zones for one area, which arrive grouped by namespace"""
+        for nsname, ns_zones in itertools.groupby(zones, key=lambda z: z.nsname):
+            ns = get_namespace(nsname)
+            fp.write(f'''
 namespace {ns} {{''')
-        for zone in zoneinfo:
-            if zone.nsname == nsname:
-                write_zone(header, zone)
-        header.write(f'}} // namespace {ns}\n')
+            for zone in ns_zones:
+                self.resolver.resolve(zone)
+                write_zone(fp, zone)
+                if stats:
+                    stats.add_zone(zone)
+                if args.transitions == 'delta' and zone.transitions and not zone.transitions_alias:
+                    self.delta_saved += get_transitions_size(zone.transitions, 'full') - get_transitions_size(zone.transitions, 'delta')
+            fp.write(f'}} // namespace {ns}\n')
+
+    def report(self):
+        if not (args.stats or getattr(args, 'verbose', False)):
+            return
+        if self.resolver.saved:
+            print(f'De-duplication saved {self.resolver.saved} bytes', file=sys.stderr)
+        if args.transitions == 'delta':
+            print(f'Transition encoding saved {self.delta_saved} bytes', file=sys.stderr)
+
+
+def get_area_names(names: list[str], areas: list[str]) -> dict[str, list[str]]:
+    """Zone names for each area, in lookup order"""
+    area_names = {area: [] for area in areas}
+    for name in names:
+        area = name.partition('/')[0]
+        if area in area_names:
+            area_names[area].append(name)
+    return area_names
+
+
+def write_area_vector(source, area: str, names: list[str]):
+    entries = ''.join(f'\t&{get_namespace(name.partition("/")[2])}::info,\n' for name in names)
+    source.write(f'''namespace {area} {{
+DEFINE_FSTR_VECTOR(zones, Info,
+{entries})
+}} // namespace {area}
+
+''')
+
+
+def write_area_map(source, names: list[str], area_names: dict[str, list[str]]):
+    """Write `areas` map and `zoneIndex`"""
+    source.write('DEFINE_FSTR_MAP(areas, FSTR::String, ZoneList,\n')
+    source.write(''.join(f'\t{{&{area}::area, &{area}::zones}},\n' for area in ZONE_AREAS if area in area_names))
+    source.write(''')
+
+''')
+    # Sort is stable so any entries with the same hash remain in lookup order
+    index = sorted(((get_zone_hash(name), name) for name in names if name.partition('/')[0] in area_names), key=lambda e: e[0])
+    source.write('DEFINE_FSTR_ARRAY(zoneIndex, ZoneIndexEntry,\n')
+    source.write(''.join(f'\t{{{hash:#010x}, &{name.partition("/")[0]}::area, &{get_namespace(name)}::info}},\t// {name}\n' for hash, name in index))
+    source.write(''')
+
+} // namespace TZ
+''')
+
+
+def write_zones(names: list[str], zones: Iterable[TimezoneInfo], header, source):
+    """Generate code for zones as they are produced.
+    `names` lists all zones in lookup order; `zones` must produce them in `get_output_order(names)`.
+    """
+    intro = get_output_intro(names)
+    areas = get_areas(names)
+
+    header.write(intro)
+    write_header_config(header, areas)
+
+    header.write('\n\n/* ZONES */\n')
+
+    writer = ZoneWriter()
+    for _, area_zones in itertools.groupby(zones, key=lambda z: z.area):
+        writer.write_area(header, area_zones)
 
     header.write('''
 } // namespace TZ
 ''')
 
+    writer.report()
 
     if not source:
         return
@@ -275,60 +881,327 @@ namespace {ns} {{''')
 
 namespace TZ {
 ''')
-    for area in areas:
-        source.write(f'''namespace {area} {{
-DEFINE_FSTR_VECTOR(zones, Info,
-''')
-        for zone in zoneinfo:
-            if zone.area != area:
-                continue
-            ns = get_namespace(zone.location)
-            source.write(f'\t&{ns}::info,\n')
-        source.write(f''')
-}} // namespace {area}
+    area_names = get_area_names(names, areas)
+    for area, area_zones in area_names.items():
+        write_area_vector(source, area, area_zones)
+    write_area_map(source, names, area_names)
+
+
+# Directory for per-area files written with --split
+SPLIT_DIR = 'tzdata'
+# Header containing options and area declarations, included by each area header
+SPLIT_CONFIG_HEADER = 'config.h'
+
+
+def write_zones_split(names: list[str], zones: Iterable[TimezoneInfo]):
+    """Generate code as for `write_zones` but with separate header and source files for each area.
+    `tzdata.h` includes all of these, and `tzdata.cpp` contains the area map and zone index.
+    """
+    intro = get_output_intro(names)
+    areas = get_areas(names)
+    area_names = get_area_names(names, areas)
+    split_dir = os.path.join(args.output, SPLIT_DIR)
+    os.makedirs(split_dir, exist_ok=True)
+    remove_stale_files(names)
+
+    with OutputFile(os.path.join(split_dir, SPLIT_CONFIG_HEADER)) as header:
+        header.write(intro + '\n#pragma once\n')
+        write_header_config(header, areas)
+        header.write('''
 
+} // namespace TZ
 ''')
-    source.write('DEFINE_FSTR_MAP(areas, FSTR::String, ZoneList,\n')
-    for area in ZONE_AREAS:
-        source.write(f'\t{{&{area}::area, &{area}::zones}},\n')
-    source.write(''')
 
+    # Aliases are kept within each area so headers are independent of each other
+    writer = ZoneWriter(per_area=True)
+    for area, area_zones in itertools.groupby(zones, key=lambda z: z.area):
+        with OutputFile(os.path.join(split_dir, f'{area}.h')) as header:
+            header.write(intro + f'''
+#pragma once
+
+#include "{SPLIT_CONFIG_HEADER}"
+
+namespace TZ {{
+''')
+            writer.write_area(header, area_zones)
+            header.write('''
 } // namespace TZ
 ''')
+        with OutputFile(os.path.join(split_dir, f'{area}.cpp')) as source:
+            source.write(intro + f'''
+#include "{area}.h"
+
+namespace TZ {{
+''')
+            write_area_vector(source, area, area_names[area])
+            source.write('} // namespace TZ\n')
+
+    writer.report()
+
+    with OutputFile(os.path.join(args.output, 'tzdata.h')) as header:
+        includes = ''.join(f'#include "{SPLIT_DIR}/{area}.h"\n' for area in areas)
+        header.write(intro + f'''
+#pragma once
+
+#include "{SPLIT_DIR}/{SPLIT_CONFIG_HEADER}"
+{includes}''')
+
+    with OutputFile(os.path.join(args.output, 'tzdata.cpp')) as source:
+        source.write(intro + '''
+#include "tzdata.h"
+
+namespace TZ {
+''')
+        write_area_map(source, names, area_names)
+
+
+def remove_stale_files(names: list[str]):
+    """Remove area files not in current output, as the build compiles everything in the split directory"""
+    split_dir = os.path.join(args.output, SPLIT_DIR)
+    if not os.path.isdir(split_dir):
+        return
+    output_files = set(get_output_files(names))
+    for entry in os.scandir(split_dir):
+        if entry.name.endswith(('.h', '.cpp')) and entry.path not in output_files:
+            os.remove(entry.path)
+
+
+def get_output_files(names: list[str]) -> list[str]:
+    """Files written by `write_output`"""
+    files = ['tzdata.h', 'tzdata.cpp']
+    if args.split:
+        files.append(f'{SPLIT_DIR}/{SPLIT_CONFIG_HEADER}')
+        files += [f'{SPLIT_DIR}/{area}{ext}' for area in get_areas(names) for ext in ('.h', '.cpp')]
+    return [os.path.join(args.output, name) for name in files]
+
+
+def write_output(names: list[str], zones: Iterable[TimezoneInfo]):
+    """Write generated code to output directory"""
+    if args.split:
+        write_zones_split(names, zones)
+        return
+    remove_stale_files(names)
+    header_file, source_file = get_output_files(names)
+    with OutputFile(header_file) as header, OutputFile(source_file) as source:
+        write_zones(names, zones, header, source)
+
+
+def estimate_zone_size(zone: TimezoneInfo) -> dict[str, int]:
+    """Estimate flash used by each component of a zone with current options.
+    Components shared with another zone (aliases) are not counted.
+    """
+    # Info location, vector entry and zone index entry
+    size = {'info': POINTER_SIZE + len(zone.location) + 1 + POINTER_SIZE + ZONE_INDEX_ENTRY_SIZE}
+    if args.name:
+        size['name'] = POINTER_SIZE
+    if args.tzstr:
+        size['tzstr'] = POINTER_SIZE + (0 if zone.tzstr_alias else len(zone.tzstr) + 1)
+    if args.rule:
+        size['rule'] = 2 * POINTER_SIZE + RULE_SIZE * (2 if zone.rules.dst else 1)
+    if args.transitions:
+        size['transitions'] = 2 * POINTER_SIZE + len(zone.tznames)
+        if zone.transitions and not zone.transitions_alias:
+            size['transitions'] += get_transitions_size(zone.transitions, args.transitions)
+    return size
+
+
+def estimate_zone_sizes(zones: Iterable[TimezoneInfo]) -> dict[str, dict[str, int]]:
+    """Estimate flash used by each component of each zone.
+    Zones must be in output order so aliases are resolved as in `write_zones`.
+    """
+    resolver = AliasResolver(per_area=args.split)
+    sizes = {}
+    for zone in zones:
+        resolver.resolve(zone)
+        sizes[zone.name] = estimate_zone_size(zone)
+    return sizes
+
+
+def get_area_overhead(area: str) -> int:
+    """Estimate flash used by area string, zone vector header and map entry"""
+    return get_fstr_array_size(len(area) + 1, 1) + FSTR_HEADER_SIZE + 2 * POINTER_SIZE
+
+
+def estimate_area_size(names: list[str]) -> int:
+    """Estimate flash used by area strings, vectors and map"""
+    return sum(get_area_overhead(area) for area in {name.partition('/')[0] for name in names})
+
+
+def write_zones_budget():
+    """Choose the richest options which fit a flash budget for the given zones"""
+    zone_list = get_zone_list()
+    priorities = {}
+    for s in args.zones:
+        pattern, _, priority = s.partition('=')
+        matches = zone_list.find_matches(pattern)
+        if not matches:
+            raise RuntimeError(f"{pattern} doesn't match any known timezone names")
+        for name in matches:
+            priorities[name] = max(priorities.get(name, 0), int(priority or 0))
+    names = sorted(priorities)
+    output_order = get_output_order(names)
+    # Parse transitions for the widest window, narrow it as required
+    zoneinfo = list(iter_zoneinfo(output_order))
+    all_transitions = {zone.name: zone.transitions for zone in zoneinfo}
+    area_size = estimate_area_size(names)
+    from datetime import datetime, timezone
+    first_year, last_year = getattr(args, 'from'), args.to
+    if first_year > last_year:
+        raise RuntimeError(f'Invalid range of years {first_year} to {last_year}')
+    # Centre window on the current year, or nearest one in range
+    this_year = min(max(datetime.now(timezone.utc).year, first_year), last_year)
+
+    def get_window(years: int) -> tuple[int, int]:
+        """Window of years either side of the current one"""
+        return max(first_year, this_year - years), min(last_year, this_year + years)
+
+    def estimate(name: bool, transitions: str = None, years: int = 0,
+                 exclude: set = ()) -> tuple[int, dict[str, dict[str, int]]]:
+        args.name, args.tzstr, args.rule, args.transitions = name, True, False, transitions
+        time_from, time_to = get_time_range(*get_window(years))
+        for zone in zoneinfo:
+            t = all_transitions[zone.name]
+            zone.transitions = select_transitions(t, time_from, time_to) if t and zone.name not in exclude else None
+        sizes = estimate_zone_sizes(zoneinfo)
+        return area_size + sum(sum(size.values()) for size in sizes.values()), sizes
+
+    # Options in order of preference, each richer than the last
+    min_size = estimate(False)[0]
+    if min_size > args.size:
+        raise RuntimeError(f'Budget too small, at least {min_size} bytes required')
+    name = estimate(True)[0] <= args.size
+    choice = (name, None, 0, set())
+    max_years = max(this_year - first_year, last_year - this_year)
+    best_years = -1
+    for encoding in 'full', 'delta':
+        if estimate(name, encoding)[0] > args.size:
+            continue
+        # Widest window which fits
+        lo, hi = 0, max_years
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if estimate(name, encoding, mid)[0] <= args.size:
+                lo = mid
+            else:
+                hi = mid - 1
+        # Full encoding is faster to read so only use delta if it gives a wider window
+        if lo > best_years:
+            best_years = lo
+            choice = (name, encoding, lo, set())
+    if best_years < 0:
+        # Drop transitions from lowest priority zones until the current year fits
+        exclude = set()
+        for zone_name in sorted((n for n in names if all_transitions[n]), key=lambda n: (priorities[n], n)):
+            exclude.add(zone_name)
+            encoding = next((e for e in ('full', 'delta') if estimate(name, e, 0, exclude)[0] <= args.size), None)
+            if encoding:
+                choice = (name, encoding, 0, exclude)
+                break
+
+    total, sizes = estimate(*choice)
+    name, encoding, years, exclude = choice
+    window = get_window(years)
+
+    os.makedirs(args.output, exist_ok=True)
+    write_output(names, iter(zoneinfo))
+
+    options = ['--tzstr'] + (['--name'] if name else [])
+    if encoding:
+        options += ['--transitions' if encoding == 'full' else '--transitions-delta', f'--from {window[0]}', f'--to {window[1]}']
+    print(f'Options: {" ".join(options)}')
+    if exclude:
+        print(f'Transitions omitted for: {", ".join(sorted(exclude))}')
+    print(f'Estimated size {total} of {args.size} bytes for {len(names)} zones')
+    components = {}
+    for size in sizes.values():
+        for k, v in size.items():
+            components[k] = components.get(k, 0) + v
+    components['areas'] = area_size
+    for k, v in components.items():
+        print(f'  {k:12} {v:8}')
+    if args.verbose:
+        for zone_name in names:
+            size = sizes[zone_name]
+            print(f'  {zone_name:40} {sum(size.values()):6}  ' + ', '.join(f'{k} {v}' for k, v in size.items()))
+
+
+def check_sources():
+    """Generate output from both TZif files and tzdata.zi and compare them"""
+    results = {}
+    for source_format in 'tzif', 'zi':
+        args.source_format = source_format
+        names = get_zone_list()
+        zones = {}
+        def get_zones():
+            for zone in iter_zoneinfo(get_output_order(names)):
+                zones[zone.name] = zone
+                yield zone
+        header = io.StringIO()
+        source = io.StringIO()
+        write_zones(names, get_zones(), header, source)
+        results[source_format] = zones, header.getvalue() + source.getvalue()
+
+    (tzif_zones, tzif_output), (zi_zones, zi_output) = results.values()
+    errors = []
+    for name in sorted(tzif_zones.keys() ^ zi_zones.keys()):
+        errors.append(f'{name}: only in {"tzif" if name in tzif_zones else "zi"}')
+    for name in sorted(tzif_zones.keys() & zi_zones.keys()):
+        a, b = tzif_zones[name], zi_zones[name]
+        for attr in 'tzstr', 'tznames', 'transitions':
+            if getattr(a, attr) != getattr(b, attr):
+                errors.append(f'{name}: {attr} differs')
+    if not errors and tzif_output != zi_output:
+        errors.append('Generated output differs')
+    for e in errors:
+        print(e)
+    print(f'{len(tzif_zones)} zones checked, {len(errors)} differences')
+    if errors:
+        sys.exit(1)
+
+
+def is_zone_file(name: str) -> bool:
+    """Check whether name identifies a TZif file directly, without scanning the database"""
+    if args.source_format != 'tzif' or name.partition('/')[0] not in ZONE_AREAS or os.path.normpath(name) != name:
+        return False
+    path = os.path.join(get_zoneinfo_path(), name)
+    dirname, filename = os.path.split(path)
+    # File system may not be case-sensitive
+    return '.' not in filename and os.path.isfile(path) and filename in os.listdir(dirname)
 
 
 def print_zones():
-    zone_list = ZoneList()
-    if not args.strings:
-        zone_names = zone_list
+    if args.strings and all(is_zone_file(s) for s in args.strings):
+        # Exact names need no fuzzy matching
+        zone_names = sorted(set(args.strings))
+    elif not args.strings:
+        zone_names = get_zone_list()
     else:
+        zone_list = get_zone_list()
         zone_names = set()
-        for s in args.strings:
-            matches = zone_list.find_matches(s)
+        for s, matches in zone_list.find_matches_batch(args.strings).items():
             if not matches:
                 raise RuntimeError(f"{s} doesn't match any known timezone names")
             zone_names |= set(matches)
         zone_names = sorted(zone_names)
 
     if args.name or args.tzstr or args.rule or args.transitions:
-        zoneinfo = [get_info(n) for n in zone_names]
-        write_zones(zoneinfo, sys.stdout, None)
+        write_zones(zone_names, iter_zoneinfo(get_output_order(zone_names)), sys.stdout, None)
     else:
         print("\n".join(zone_names))
 
 
 def print_posix_rule():
     zoneinfo = [
-        TimezoneInfo(name=f'Custom/Rule{i+1}', tzstr=s, rules=decode_tzstr(s), tzinfo=None)
+        TimezoneInfo(name=f'Custom/Rule{i+1}', tzstr=s, rules=decode_tzstr(s))
         for i, s in enumerate(args.strings)]
-    write_zones(zoneinfo, sys.stdout, None)
+    names = [zone.name for zone in zoneinfo]
+    write_zones(names, zoneinfo, sys.stdout, None)
 
 
 def dump_tzinfo():
     desigs = set()
     max_desig_len = 0
-    for name in ZoneList():
-        zone = get_info(name)
+    for zone in get_zoneinfo(get_zone_list()):
         max_desig_len = max(max_desig_len, len(zone.info.tznames))
         filename = os.path.join(args.output, zone.name)
         if not zone.transitions:
@@ -348,15 +1221,107 @@ def dump_tzinfo():
     print(f'{len(desigs)} unique designators, total length {sum(len(d)+1 for d in desigs)}, max {max(len(d) for d in desigs)}, max list len {max_desig_len}')
 
 
-def main():
+def pack_tzinfo():
+    from tzpack import write_pack
+    zoneinfo = get_zoneinfo(get_zone_list())
+    with open(args.output, 'wb') as f:
+        size = write_pack(f, get_zoneinfo_version(), zoneinfo)
+    print(f'{len(zoneinfo)} zones, {size} bytes')
+
+
+def load_source(path: str) -> tuple[str, list[TimezoneInfo], bytes]:
+    """Parse all zones from a zoneinfo source, returning version, zones and database file content"""
+    import tzdb
+    from tzpack import write_pack
+    global zi_database
+    tzdb.ZONEINFO_PATH = path
+    zi_database = None
+    version = get_zoneinfo_version()
+    zoneinfo = get_zoneinfo(get_zone_list())
+    output = io.BytesIO()
+    write_pack(output, version, zoneinfo)
+    return version, zoneinfo, output.getvalue()
+
+
+def diff_sources():
+    from tzpack import Patch, get_zone_changes
+    old_version, old_zones, old_data = load_source(args.old)
+    new_version, new_zones, new_data = load_source(args.new)
+    patch = Patch.create(old_version, old_data, old_zones, new_version, new_data, new_zones)
+    old_index = {zone.name: zone for zone in old_zones}
+    for name in patch.removed:
+        print(f'{name}: removed')
+    for zone in patch.zones:
+        old = old_index.get(zone.name)
+        changes = ', '.join(get_zone_changes(old, zone)) if old else 'added'
+        print(f'{zone.name}: {changes}')
+    with open(args.output, 'wb') as f:
+        size = patch.write(f)
+    print(f'{old_version} -> {new_version}: {len(patch.removed)} removed, {len(patch.zones)} changed, {size} bytes (database {len(new_data)} bytes)')
+
+
+def apply_patch():
+    from tzpack import Patch
+    patch = Patch.read(args.patch)
+    data = patch.apply(args.input)
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    print(f'{patch.old_version} -> {patch.new_version}: {len(data)} bytes')
+
+
+def verify_zone(zone: str) -> list[tzverify.Mismatch]:
+    import tzverify
+    return tzverify.verify_zone(get_zoneinfo_path(), zone, args.first_year, args.last_year)
+
+
+def verify_zones():
+    """Check rules for all zones against python zoneinfo and TZif transitions, writing results as JSON"""
+    import json
+    if args.first_year is None:
+        from datetime import datetime, timezone
+        args.first_year = datetime.now(timezone.utc).year
+    if args.last_year is None:
+        args.last_year = args.first_year + 30
+    zone_list = get_zone_list()
+    mismatches = [m for res in map_zones(verify_zone, zone_list) for m in res]
+    counts = {check: sum(m.check == check for m in mismatches) for check in ('zoneinfo', 'rules')}
+    result = {
+        'source': get_zoneinfo_path(),
+        'version': get_zoneinfo_version(),
+        'years': [args.first_year, args.last_year],
+        'zones': len(zone_list),
+        'counts': counts,
+        'mismatches': [m.asdict() for m in mismatches],
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=1)
+    else:
+        json.dump(result, sys.stdout, indent=1)
+        print()
+    zones = {check: len({m.zone for m in mismatches if m.check == check}) for check in counts}
+    print(f'{len(zone_list)} zones checked for {args.first_year} to {args.last_year}: '
+          f'{counts["zoneinfo"]} zoneinfo mismatches in {zones["zoneinfo"]} zones, '
+          f'{counts["rules"]} rule mismatches in {zones["rules"]} zones', file=sys.stderr)
+    if counts['zoneinfo'] or (args.strict and counts['rules']):
+        sys.exit(1)
+
+
+def get_parser() -> ArgumentParser:
     parser = ArgumentParser(description='Generate C++ source from compiled IANA database')
     parser.add_argument('--source', help='Optional path to compiled zoneinfo, overrides python zoneinfo settings')
     parser.add_argument('--name', action='store_true', help='Include zone area and name() method in TZ Info')
     parser.add_argument('--tzstr', action='store_true', help='Include POSIX timezone strings in TZ Info')
     parser.add_argument('--rule', action='store_true', help='Include decoded Rule definitions in TZ Info')
-    parser.add_argument('--transitions', action='store_true', help='Include transition data')
+    parser.add_argument('--transitions', action='store_const', const='full', help='Include transition data')
+    parser.add_argument('--transitions-delta', dest='transitions', action='store_const', const='delta', help='Include transition data, delta-encoded to save space')
     parser.add_argument('--from', type=int, default=1000, help='First year of interest')
     parser.add_argument('--to',  type=int, default=9999, help='Last year of interest')
+    parser.add_argument('--source-format', choices=['tzif', 'zi'], default='tzif', help='Read compiled TZif files or compact source (tzdata.zi)')
+    parser.add_argument('--zi-bloat', choices=['fat', 'slim'], default='fat', help='Transitions to generate from tzdata.zi, to match `zic -b` setting of TZif files')
+    parser.add_argument('--zone-index', help='Cache zone directory index in this file')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Number of processes to use for parsing zones (0 for one per CPU)')
+    parser.add_argument('--stats', help='Write phase timings, counts and estimated sizes to this JSON file')
     parser.set_defaults(func=None)
     subparsers = parser.add_subparsers()
 
@@ -370,23 +1335,70 @@ def main():
 
     sub = subparsers.add_parser('full', help='Generate header and source code for database')
     sub.add_argument('output', help='Directory to write header/source files')
+    sub.add_argument('--no-cache', dest='cache', action='store_false', help=f'Do not use build cache ({CACHE_FILENAME})')
+    sub.add_argument('--split', action='store_true', help=f'Write separate header and source for each area into "{SPLIT_DIR}" sub-directory')
+    sub.add_argument('--verbose', '-v', action='store_true', help='Report space saved by de-duplication and encoding')
     sub.set_defaults(func=write_zones_full)
 
+    sub = subparsers.add_parser('budget', help='Generate header and source code for zones using the richest options which fit a flash budget')
+    sub.add_argument('output', help='Directory to write header/source files')
+    sub.add_argument('size', type=int, help='Flash budget in bytes')
+    sub.add_argument('zones', nargs='+', help='Zone names to include, as for "zone" command. Append "=N" to set priority (default 0).')
+    sub.add_argument('--verbose', '-v', action='store_true', help='Report size of each zone')
+    sub.add_argument('--split', action='store_true', help=f'Write separate header and source for each area into "{SPLIT_DIR}" sub-directory')
+    sub.set_defaults(func=write_zones_budget)
+
     sub = subparsers.add_parser('dump', help='Dump timezone files in minimal standard format')
     sub.add_argument('output', help='Directory to write files')
     sub.set_defaults(func=dump_tzinfo)
 
+    sub = subparsers.add_parser('check-source', help='Check TZif and tzdata.zi sources produce identical output')
+    sub.set_defaults(func=check_sources)
+
+    sub = subparsers.add_parser('verify', help='Verify rules against python zoneinfo and TZif transitions')
+    sub.add_argument('--first-year', type=int, help='First year to check (default: current year)')
+    sub.add_argument('--last-year', type=int, help='Last year to check (default: first year + 30)')
+    sub.add_argument('--strict', action='store_true', help='Fail if rules differ from TZif transitions, as well as from zoneinfo')
+    sub.add_argument('--output', help='Write JSON results to file instead of stdout')
+    sub.set_defaults(func=verify_zones)
+
+    sub = subparsers.add_parser('pack', help='Write indexed binary database')
+    sub.add_argument('output', help='Database file to write')
+    sub.set_defaults(func=pack_tzinfo)
+
+    sub = subparsers.add_parser('diff', help='Compare two zoneinfo sources and write a patch for the binary database')
+    sub.add_argument('old', help='Path to old compiled zoneinfo')
+    sub.add_argument('new', help='Path to new compiled zoneinfo')
+    sub.add_argument('output', help='Patch file to write')
+    sub.set_defaults(func=diff_sources)
+
+    sub = subparsers.add_parser('apply', help='Apply patch to binary database')
+    sub.add_argument('input', help='Database file written from old source')
+    sub.add_argument('patch', help='Patch file')
+    sub.add_argument('output', help='Database file to write')
+    sub.set_defaults(func=apply_patch)
+
+    return parser
+
+
+def main():
+    parser = get_parser()
     global args
     args = parser.parse_args()
 
     if args.source:
-        print('Set ZONEINFO_PATH')
         import tzdb
-        # global ZONEINFO_PATH
         tzdb.ZONEINFO_PATH = args.source
 
+    if args.stats:
+        global stats
+        stats = Stats()
+        stats.install()
+
     if args.func:
         args.func()
+        if stats:
+            stats.write(args.stats)
     else:
         parser.print_help()
 
@@ -0,0 +1,125 @@
+"""
+Batch conversion of UTC timestamps to local time using TZif transition tables
+
+Timestamps are located in the sorted transition table, using numpy if available
+or `bisect` otherwise. Timestamps after the last transition use the zone's POSIX rule.
+
+Example:
+
+    conv = ZoneConverter.from_zone('Europe/London')
+    res = conv.convert([1700000000, 1720000000])
+    print(res.local, res.offset, res.isdst, res.designator)
+
+"""
+
+from __future__ import annotations
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from tzdb import get_zoneinfo_path
+from tzif import TzFile
+from tzstr import RuleEvaluator, decode_tzstr
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@dataclass
+class LocalTimes:
+    """Results of a conversion, one entry per timestamp.
+    These are numpy arrays if numpy is available, otherwise lists.
+    """
+    local: list[int]
+    offset: list[int] # Seconds east of UTC
+    isdst: list[bool]
+    designator: list[str]
+
+
+class ZoneConverter:
+    def __init__(self, tzfile: TzFile):
+        info = tzfile.info[-1]
+        self.transitions = info.transitions
+        self.ttindex = info.ttindex
+        # Time types as (offset, isdst, designator)
+        self.types = [(utoff, bool(isdst), info.get_tzname(desigidx)) for utoff, isdst, desigidx in zip(info.utoff, info.isdst, info.desigidx)]
+        self.rules = decode_tzstr(tzfile.tzstr) if tzfile.tzstr else None
+        if self.rules:
+            self.evaluator = RuleEvaluator(self.rules)
+            # Append types for POSIX rules
+            self.std_type = len(self.types)
+            self.types.append((self.rules.std.offset, False, self.rules.std.name))
+            if self.rules.dst:
+                self.dst_type = len(self.types)
+                self.types.append((self.rules.dst.offset, True, self.rules.dst.name))
+
+    @classmethod
+    def from_zone(cls, zone: str, zoneinfo_path: str = None) -> ZoneConverter:
+        return cls(TzFile(os.path.join(zoneinfo_path or get_zoneinfo_path(), zone), fast=True))
+
+    def use_rules(self, utc: int) -> bool:
+        return self.rules is not None and (not self.transitions or utc > self.transitions[-1])
+
+    def get_types(self, timestamps) -> list[int]:
+        """Get index into self.types for each timestamp"""
+        res = []
+        for utc in timestamps:
+            if self.use_rules(utc):
+                res.append(self.dst_type if self.evaluator.is_dst(utc) else self.std_type)
+                continue
+            # Times before first transition use first time type
+            i = bisect_right(self.transitions, utc) - 1
+            res.append(self.ttindex[i] if i >= 0 else 0)
+        return res
+
+    def get_types_np(self, timestamps):
+        utc = np.asarray(timestamps, dtype=np.int64)
+        if len(self.transitions):
+            transitions = np.asarray(self.transitions, dtype=np.int64)
+            ttindex = np.asarray(self.ttindex, dtype=np.intp)
+            i = np.searchsorted(transitions, utc, side='right') - 1
+            types = np.where(i >= 0, ttindex[np.maximum(i, 0)], 0)
+        else:
+            types = np.zeros(len(utc), dtype=np.intp)
+        if self.rules is None:
+            return types
+        mask = utc > self.transitions[-1] if len(self.transitions) else np.ones(len(utc), dtype=bool)
+        if not mask.any():
+            return types
+        if not self.rules.dst:
+            types[mask] = self.std_type
+            return types
+        rule_utc = utc[mask]
+        years = rule_utc.astype('datetime64[s]').astype('datetime64[Y]').astype(np.int64) + 1970
+        rule_types = np.empty(len(rule_utc), dtype=np.intp)
+        for year in np.unique(years):
+            sel = years == year
+            times, isdst = self.evaluator.get_window(int(year))
+            i = np.searchsorted(np.array(times, dtype=np.int64), rule_utc[sel], side='right') - 1
+            rule_types[sel] = np.where(np.array(isdst)[i], self.dst_type, self.std_type)
+        types[mask] = rule_types
+        return types
+
+    def convert(self, timestamps) -> LocalTimes:
+        """Convert a sequence of UTC timestamps to local time"""
+        if np is not None:
+            types = self.get_types_np(timestamps)
+            offsets = np.array([t[0] for t in self.types], dtype=np.int64)[types]
+            return LocalTimes(
+                local=np.asarray(timestamps, dtype=np.int64) + offsets,
+                offset=offsets,
+                isdst=np.array([t[1] for t in self.types], dtype=bool)[types],
+                designator=np.array([t[2] for t in self.types], dtype=object)[types])
+
+        types = [self.types[t] for t in self.get_types(timestamps)]
+        return LocalTimes(
+            local=[utc + t[0] for utc, t in zip(timestamps, types)],
+            offset=[t[0] for t in types],
+            isdst=[t[1] for t in types],
+            designator=[t[2] for t in types])
+
+
+def convert(zone: str, timestamps) -> LocalTimes:
+    """Convert a sequence of UTC timestamps to local time for a named zone"""
+    return ZoneConverter.from_zone(zone).convert(timestamps)
@@ -2,9 +2,12 @@
 IANA timezone database utilities
 """
 
+from __future__ import annotations
 import os
 import re
-from importlib import resources
+from bisect import bisect_left
+from collections.abc import Iterable
+from dataclasses import dataclass
 
 # File containing compact textual source of IANA database, with version
 TZDATA_ZI = 'tzdata.zi'
@@ -26,9 +29,24 @@ ZONE_AREAS = [
 ]
 
 
+CMPSTR_PATTERN = re.compile(r'[^a-zA-Z]')
+
+
+def get_cmpstr(s: str) -> str:
+    """Normalise a zone name for comparison"""
+    return CMPSTR_PATTERN.sub('', s.lower())
+
+
+def get_zone_hash(name: str) -> int:
+    """32-bit FNV-1a hash of normalised zone name, must match `TZ::getZoneNameHash()`"""
+    hash = 0x811c9dc5
+    for c in get_cmpstr(name).encode():
+        hash = ((hash ^ c) * 0x01000193) & 0xffffffff
+    return hash
+
+
 # Normalise path on Windows, backslashes are problematic
 def normalise_path(path: str):
-    print(f'normalise {path}')
     return path.replace('\\', '/')
 
 
@@ -46,6 +64,7 @@ def find_zoneinfo_path():
     except ImportError:
         pass
     # Last resort, use tzdata package (if installed)
+    from importlib import resources
     try:
         ZONEINFO_PATH = normalise_path(os.path.join(resources.files('tzdata'), 'zoneinfo'))
     except AttributeError:
@@ -76,34 +95,112 @@ def get_zoneinfo_version(zoneinfo_path: str = None) -> str:
         return '0000x'
 
 
+@dataclass
+class ZoneEntry:
+    size: int
+    device: int
+    inode: int
+
+
 class ZoneList(list):
-    def __init__(self, zoneinfo_path: str = None):
+    """Sorted list of zone names found in the database.
+
+    File details are available via `entries`.
+    Provide `cache_file` to store the directory index, keyed on the database path and version,
+    so subsequent invocations can skip the directory scan.
+    """
+    def __init__(self, zoneinfo_path: str = None, cache_file: str = None):
         if not zoneinfo_path:
             zoneinfo_path = get_zoneinfo_path()
         self.version = get_zoneinfo_version(zoneinfo_path)
-        zones = set()
-        def scan_dirs(root, dirs):
-            for d in dirs:
-                for wroot, wdir, wnames in os.walk(os.path.join(zoneinfo_path, root, d)):
-                    for name in wnames:
-                        if '.' in name: # tzdata package has non-TZif files here
-                            continue
-                        path = os.path.join(wroot, name)
-                        zone = os.path.relpath(path, zoneinfo_path).replace('\\', '/')
-                        zones.add(zone)
-                    scan_dirs(wroot, wdir)
-        scan_dirs('', ZONE_AREAS)
-        self.extend(sorted(zones))
-
-    def find_matches(self, name: str):
-        def get_cmpstr(s: str):
-            return re.sub(r'[^a-zA-Z]', '', s.lower())
-        matches = []
-        cmp_name = get_cmpstr(name)
-        for z in self:
-            cmpz = get_cmpstr(z)
-            if cmpz == cmp_name:
-                return [z] # Exact match
-            if cmpz.startswith(cmp_name):
-                matches.append(z) # Partial match
-        return matches
+        self.name_index = None
+        self.entries = self.load_index(cache_file, zoneinfo_path) if cache_file else None
+        if self.entries is None:
+            self.entries = self.scan(zoneinfo_path)
+            if cache_file:
+                self.save_index(cache_file, zoneinfo_path)
+        self.extend(sorted(self.entries))
+
+    @classmethod
+    def from_names(cls, names: Iterable[str], version: str) -> ZoneList:
+        """Build list from names obtained elsewhere, e.g. tzdata.zi.
+        No file details are available so `entries` is empty.
+        """
+        self = cls.__new__(cls)
+        self.version = version
+        self.name_index = None
+        self.entries = {}
+        self.extend(sorted(names))
+        return self
+
+    @staticmethod
+    def scan(zoneinfo_path: str) -> dict[str, ZoneEntry]:
+        entries = {}
+        def scan_dir(path: str, prefix: str):
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        scan_dir(entry.path, f'{prefix}{entry.name}/')
+                    elif '.' not in entry.name: # tzdata package has non-TZif files here
+                        st = entry.stat()
+                        entries[prefix + entry.name] = ZoneEntry(st.st_size, st.st_dev, st.st_ino)
+        for area in ZONE_AREAS:
+            path = os.path.join(zoneinfo_path, area)
+            if os.path.isdir(path):
+                scan_dir(path, f'{area}/')
+        return entries
+
+    def load_index(self, filename: str, zoneinfo_path: str) -> dict[str, ZoneEntry]:
+        import json
+        try:
+            with open(filename) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('path') != zoneinfo_path or index.get('version') != self.version:
+            return None
+        return {name: ZoneEntry(*e) for name, e in index['zones'].items()}
+
+    def save_index(self, filename: str, zoneinfo_path: str):
+        import json
+        index = {
+            'path': zoneinfo_path,
+            'version': self.version,
+            'zones': {name: [e.size, e.device, e.inode] for name, e in self.entries.items()},
+        }
+        with open(filename, 'w') as f:
+            json.dump(index, f)
+
+    def get_name_index(self) -> tuple[list[str], list[int]]:
+        """Sorted list of normalised names, with corresponding positions in this list.
+        Built on first use.
+        """
+        if self.name_index is None:
+            index = sorted((get_cmpstr(z), i) for i, z in enumerate(self))
+            self.name_index = [k for k, _ in index], [i for _, i in index]
+        return self.name_index
+
+    def find_matches(self, name: str) -> list[str]:
+        """Find zones matching a name, ignoring case and punctuation.
+        Returns a single exact match if there is one, otherwise all zones starting with the given name.
+        """
+        keys, positions = self.get_name_index()
+        key = get_cmpstr(name)
+        lo = bisect_left(keys, key)
+        if lo < len(keys) and keys[lo] == key:
+            return [self[positions[lo]]] # Exact match
+        # Partial matches, '{' follows 'z'
+        hi = bisect_left(keys, key + '{', lo)
+        return [self[i] for i in sorted(positions[lo:hi])]
+
+    def find_matches_batch(self, names: Iterable[str]) -> dict[str, list[str]]:
+        """Find matches for many names in one call"""
+        cache = {}
+        res = {}
+        for name in names:
+            key = get_cmpstr(name)
+            matches = cache.get(key)
+            if matches is None:
+                matches = cache[key] = self.find_matches(key)
+            res[name] = matches
+        return res
@@ -18,9 +18,16 @@ Transition times are useful for testing though.
 from __future__ import annotations
 import os
 import re
-from struct import unpack, calcsize
+import sys
+from array import array
+from struct import pack, unpack, unpack_from, iter_unpack, calcsize
 from dataclasses import dataclass
 
+HEADER_FMT = '>4s c 15x 6L'
+HEADER_SIZE = calcsize(HEADER_FMT)
+TTINFO_FMT = '>lBB'
+TTINFO_SIZE = calcsize(TTINFO_FMT)
+
 
 def readfmt(fp, fmt: str):
     size = calcsize(fmt)
@@ -43,34 +50,64 @@ class Header:
         # Make sure it is a tzfile(5) file
         assert self.magic == b'TZif', f'Got magic {self.magic}'
 
+    def get_data_size(self, time64: bool) -> int:
+        """Size of the data block following this header"""
+        timesize = 8 if time64 else 4
+        return (self.timecnt * (timesize + 1)
+            + self.typecnt * TTINFO_SIZE
+            + self.charcnt
+            + self.leapcnt * (timesize + 4)
+            + self.isstdcnt
+            + self.isutccnt)
+
 
-@dataclass
 class TTInfo:
-    owner: object # TzInfo
-    tt_utoff: int
-    tt_isdst: bool
-    tt_desigidx: int
+    """View of a local time type, stored by index in its owning TzInfo"""
+    __slots__ = ('owner', 'index')
+
+    def __init__(self, owner: TzInfo, index: int):
+        self.owner = owner
+        self.index = index
 
     @property
-    def tzname(self):
-        return self.owner.get_tzname(self.tt_desigidx)
+    def tt_utoff(self) -> int:
+        return self.owner.utoff[self.index]
+
+    @property
+    def tt_isdst(self) -> int:
+        return self.owner.isdst[self.index]
 
     @property
-    def index(self):
-        return self.owner.timetypes.index(self)
+    def tt_desigidx(self) -> int:
+        return self.owner.desigidx[self.index]
 
     @property
-    def stdwall(self):
+    def tzname(self) -> str:
+        return self.owner.get_tzname(self.tt_desigidx)
+
+    @property
+    def stdwall(self) -> int:
         return self.owner.stdwall[self.index] if self.owner.stdwall else 0
 
     @property
-    def utlocal(self):
+    def utlocal(self) -> int:
         return self.owner.utlocal[self.index] if self.owner.utlocal else 0
 
     @property
     def indicator(self):
         return 'z' if self.utlocal else 's' if self.stdwall else 'w'
 
+    def astuple(self) -> tuple[int, int, int]:
+        return self.tt_utoff, self.tt_isdst, self.tt_desigidx
+
+    def __eq__(self, other):
+        if not isinstance(other, TTInfo):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash(self.astuple())
+
     def __repr__(self):
         return f'{self.tt_utoff} {self.tt_isdst} {self.tzname} {self.indicator}'
 
@@ -81,36 +118,80 @@ class Leap:
     correction: int
 
 
-@dataclass
 class TzInfo:
-    hdr: Header
-    info: list[TTInfo]
-    transitions: list[int]
-    ttindex: bytearray
-    timetypes: list[TTInfo]
-    tznames: bytes
-    leap: list[Leap]
-    stdwall: list[bool]
-    utlocal: list[bool]
+    """A TZif data block.
+    Time types are stored in columns, indexed by type number, and accessed via `TTInfo` views.
+    """
+    __slots__ = ('hdr', 'transitions', 'ttindex', 'utoff', 'isdst', 'desigidx', 'tznames', 'designators',
+                 'leap', 'stdwall', 'utlocal')
 
     def __init__(self, fp, time64: bool):
         timefmt = "q" if time64 else "l"
-        hdr = self.hdr = Header(*readfmt(fp, '>4s c 15x 6L'))
+        hdr = self.hdr = Header(*readfmt(fp, HEADER_FMT))
         self.transitions = readfmt(fp, f'>{hdr.timecnt}{timefmt}')
         self.ttindex = readfmt(fp, f'>{hdr.timecnt}B')
-        self.timetypes = [TTInfo(self, *readfmt(fp, f'>lBB')) for _ in range(hdr.typecnt)]
+        timetypes = [readfmt(fp, TTINFO_FMT) for _ in range(hdr.typecnt)]
         self.tznames, = readfmt(fp, f'>{hdr.charcnt}s')
+        self.set_timetypes(timetypes)
         self.leap = [readfmt(fp, f'>{timefmt}l') for _ in range(hdr.leapcnt)]
-        self.stdwall = readfmt(fp, f'>{hdr.isstdcnt}B')
-        self.utlocal = readfmt(fp, f'>{hdr.isutccnt}B')
+        self.stdwall = array('B', readfmt(fp, f'>{hdr.isstdcnt}B'))
+        self.utlocal = array('B', readfmt(fp, f'>{hdr.isutccnt}B'))
+
+    @classmethod
+    def from_buffer(cls, buf: bytes, offset: int, time64: bool) -> tuple[TzInfo, int]:
+        """Decode a data block from a buffer using computed offsets.
+        Returns the decoded block and the offset immediately following it.
+        """
+        self = cls.__new__(cls)
+        timefmt, timesize = ("q", 8) if time64 else ("l", 4)
+        view = memoryview(buf)
+        hdr = self.hdr = Header(*unpack_from(HEADER_FMT, buf, offset))
+        offset += HEADER_SIZE
+
+        def take(size: int) -> memoryview:
+            nonlocal offset
+            data = view[offset:offset+size]
+            offset += size
+            return data
+
+        self.transitions = array('q' if time64 else 'i')
+        self.transitions.frombytes(take(hdr.timecnt * timesize))
+        if sys.byteorder == 'little':
+            self.transitions.byteswap()
+        self.ttindex = array('B')
+        self.ttindex.frombytes(take(hdr.timecnt))
+        timetypes = iter_unpack(TTINFO_FMT, take(hdr.typecnt * TTINFO_SIZE))
+        self.tznames = bytes(take(hdr.charcnt))
+        self.set_timetypes(timetypes)
+        self.leap = list(iter_unpack(f'>{timefmt}l', take(hdr.leapcnt * (timesize + 4))))
+        self.stdwall = array('B', take(hdr.isstdcnt))
+        self.utlocal = array('B', take(hdr.isutccnt))
+        return self, offset
+
+    def set_timetypes(self, timetypes):
+        """Store (utoff, isdst, desigidx) time types. Designators are split out of `tznames` here so must be set first."""
+        self.utoff = array('l')
+        self.isdst = array('B')
+        self.desigidx = array('B')
+        for utoff, isdst, desigidx in timetypes:
+            self.utoff.append(utoff)
+            self.isdst.append(isdst)
+            self.desigidx.append(desigidx)
+        self.designators = {i: self.tznames[i:self.tznames.index(0, i)].decode() for i in set(self.desigidx)}
+
+    @property
+    def timetypes(self) -> list[TTInfo]:
+        return [TTInfo(self, i) for i in range(len(self.utoff))]
 
     def get_ttinfo(self, i: int) -> TTInfo:
-        idx = self.ttindex[i]
-        return self.timetypes[idx]
+        return TTInfo(self, self.ttindex[i])
 
-    def get_tzname(self, tt_desigidx: int):
-        end = self.tznames.index(0, tt_desigidx)
-        return self.tznames[tt_desigidx:end].decode()
+    def get_tzname(self, tt_desigidx: int) -> str:
+        name = self.designators.get(tt_desigidx)
+        if name is None:
+            end = self.tznames.index(0, tt_desigidx)
+            name = self.tznames[tt_desigidx:end].decode()
+        return name
 
     @classmethod
     def __repr__(cls):
@@ -122,7 +203,14 @@ class TzFile:
     info: list[TzInfo]
     tzstr: str
 
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, fast: bool = False):
+        """Parse a TZif file.
+        In fast mode the file is read in one go and only the most recent (64-bit) data block is decoded,
+        so `info` contains a single entry.
+        """
+        if fast:
+            self.load_fast(filename)
+            return
         with open(filename, "rb") as fp:
             try:
                 info = TzInfo(fp, False)
@@ -135,3 +223,41 @@ class TzFile:
                     self.tzstr = None
             except Exception as e:
                 raise RuntimeError(f'{e} reading {filename}')
+
+    def load_fast(self, filename: str):
+        with open(filename, "rb") as fp:
+            buf = fp.read()
+        try:
+            hdr = Header(*unpack_from(HEADER_FMT, buf, 0))
+            if hdr.fmtver >= b'2':
+                # Skip over the 32-bit data block
+                offset = HEADER_SIZE + hdr.get_data_size(False)
+                info, offset = TzInfo.from_buffer(buf, offset, True)
+                self.tzstr = buf[offset:].strip().decode()
+            else:
+                info, _ = TzInfo.from_buffer(buf, 0, False)
+                self.tzstr = None
+            self.info = [info]
+        except Exception as e:
+            raise RuntimeError(f'{e} reading {filename}')
+
+
+@dataclass
+class Transition:
+    """Compact representation of a single transition, as used in generated code"""
+    time: int
+    desigidx: int
+    offset: int
+    isdst: bool
+
+    def pack(self) -> bytes:
+        packed_time = pack('<q', self.time)
+        return pack('<hb', (self.offset << 1) | self.isdst, self.desigidx) + packed_time[:5]
+
+    @staticmethod
+    def unpack(data: bytes) -> Transition:
+        offset, desigidx = unpack('<hb', data[:3])
+        # Sign extend
+        packed_time = data[3:] + (b'\xff\xff' if data[7] & 0x80 else b'\x00\x00')
+        time, = unpack('<q', packed_time)
+        return Transition(time, desigidx, offset >> 1, bool(offset & 1))
@@ -0,0 +1,370 @@
+"""
+Single-file indexed binary timezone database
+
+Intended for on-disk storage or OTA updates: a device (or host tool) can locate a zone
+using a binary search of the name index, touching only the records it needs.
+
+All values are little-endian. The file contains these sections, located via the header:
+
+    Header
+    Zone index      Sorted by name, one record per zone
+    Rules           De-duplicated by POSIX string
+    Designators     Offsets into string table, referenced by transitions
+    Transitions     Shared pool, zones with identical transitions refer to the same range
+    Strings         NUL-terminated, de-duplicated
+
+A patch contains the zones which differ between two databases, so an update can be sent
+without the whole file. It has a header followed by a zlib-compressed body:
+
+    Header          Old and new versions, CRC32 of old and new database files, counts
+    Removed zones   NUL-terminated names
+    Zones           New or changed zones, each with name and tzstr (NUL-terminated),
+                    designator count (uint8) and NUL-terminated designators,
+                    transition count (uint16) and transitions, indexing the zone's own designators
+
+Applying a patch to the old database produces a file identical to one written from the new source.
+
+"""
+
+from __future__ import annotations
+import io
+import mmap
+import zlib
+from struct import pack, unpack, unpack_from, calcsize
+from dataclasses import dataclass
+from tzif import Transition
+from tzstr import Rule, RulePair, decode_tzstr
+
+MAGIC = b'TZdb'
+FORMAT_VERSION = 1
+
+# magic, format, version, zone/rule/designator/transition counts, section offsets, string table size
+HEADER_FMT = '<4sB3x8s4I6I'
+HEADER_SIZE = calcsize(HEADER_FMT)
+# name offset, rule index, transition count, first transition
+ZONE_FMT = '<IHHI'
+ZONE_SIZE = calcsize(ZONE_FMT)
+# tzstr offset, std: designator, offset, month, week, day, time, dst: (same)
+RULE_FMT = '<I' + 'HiBBBi' * 2
+RULE_SIZE = calcsize(RULE_FMT)
+DESIG_FMT = '<I'
+DESIG_SIZE = calcsize(DESIG_FMT)
+TRANSITION_SIZE = 8
+NO_DESIG = 0xffff
+
+PATCH_MAGIC = b'TZdp'
+PATCH_FORMAT_VERSION = 1
+# magic, format, old version, new version, old crc32, new crc32, removed count, zone count
+PATCH_HEADER_FMT = '<4sB3x8s8sIIHH'
+PATCH_HEADER_SIZE = calcsize(PATCH_HEADER_FMT)
+
+
+def pack_transition(t: Transition) -> bytes:
+    # As Transition.pack() but designator is unsigned as there may be more than 128
+    return pack('<hB', (t.offset << 1) | t.isdst, t.desigidx) + pack('<q', t.time)[:5]
+
+
+def unpack_transition(data: bytes) -> Transition:
+    offset, desigidx = unpack('<hB', data[:3])
+    time = int.from_bytes(data[3:8], 'little', signed=True)
+    return Transition(time, desigidx, offset >> 1, bool(offset & 1))
+
+
+def get_tzname(tznames: bytes, desigidx: int) -> str:
+    end = tznames.index(0, desigidx)
+    return tznames[desigidx:end].decode()
+
+
+class StringTable:
+    def __init__(self):
+        self.data = bytearray()
+        self.index = {}
+
+    def add(self, s: str) -> int:
+        offset = self.index.get(s)
+        if offset is None:
+            offset = self.index[s] = len(self.data)
+            self.data += s.encode() + b'\0'
+        return offset
+
+
+def write_pack(fp, version: str, zoneinfo: list) -> int:
+    """Write zones to a database file.
+    Each zone requires `name`, `tzstr`, `rules`, `tznames` and `transitions` attributes, as TimezoneInfo.
+    Returns number of bytes written.
+    """
+    strings = StringTable()
+    rules = {}
+    desigs = {}
+    transition_index = {}
+    transition_pool = bytearray()
+
+    def add_desig(name: str) -> int:
+        idx = desigs.setdefault(name, len(desigs))
+        if idx > 0xff:
+            raise ValueError('Too many designators')
+        return idx
+
+    def pack_rule(rule: Rule) -> tuple:
+        if rule is None:
+            return (NO_DESIG, 0, 0, 0, 0, 0)
+        t = rule.time
+        sign = -1 if t.hour < 0 else 1
+        secs = t.hour * 3600 + sign * (t.minute * 60 + t.second)
+        return (add_desig(rule.name), rule.offset, rule.month, rule.week, rule.day, secs)
+
+    zone_records = []
+    for zone in sorted(zoneinfo, key=lambda z: z.name.encode()):
+        rule_idx = rules.get(zone.tzstr)
+        if rule_idx is None:
+            rule_idx = rules[zone.tzstr] = len(rules)
+        transitions = b''.join(
+            pack_transition(Transition(t.time, add_desig(get_tzname(zone.tznames, t.desigidx)), t.offset, t.isdst))
+            for t in zone.transitions or [])
+        start = transition_index.get(transitions)
+        if start is None:
+            start = transition_index[transitions] = len(transition_pool) // TRANSITION_SIZE
+            transition_pool += transitions
+        zone_records.append(pack(ZONE_FMT, strings.add(zone.name), rule_idx,
+            len(transitions) // TRANSITION_SIZE, start))
+
+    rule_records = []
+    for tzstr in rules:
+        rp = decode_tzstr(tzstr)
+        rule_records.append(pack(RULE_FMT, strings.add(tzstr), *pack_rule(rp.std), *pack_rule(rp.dst)))
+
+    desig_records = [pack(DESIG_FMT, strings.add(d)) for d in desigs]
+
+    sections = [b''.join(zone_records), b''.join(rule_records), b''.join(desig_records), bytes(transition_pool), bytes(strings.data)]
+    offsets = []
+    offset = HEADER_SIZE
+    for data in sections:
+        offsets.append(offset)
+        offset += len(data)
+    header = pack(HEADER_FMT, MAGIC, FORMAT_VERSION, version.encode(),
+        len(zone_records), len(rule_records), len(desig_records), len(transition_pool) // TRANSITION_SIZE,
+        *offsets, len(strings.data))
+    fp.write(header)
+    for data in sections:
+        fp.write(data)
+    return offset
+
+
+@dataclass
+class PackZone:
+    name: str
+    tzstr: str
+    rules: RulePair
+    transitions: list[Transition] # desigidx values refer to TzPack.designators, or offsets into tznames if set
+    tznames: bytes = None
+
+
+class TzPack:
+    """Read zones from a database file without loading it into memory"""
+
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, fmtver, version, self.zone_count, self.rule_count, self.desig_count, self.transition_count,
+                self.zones_offset, self.rules_offset, self.desigs_offset, self.transitions_offset,
+                self.strings_offset, self.strings_size) = unpack_from(HEADER_FMT, self.buf)
+            if magic != MAGIC or fmtver != FORMAT_VERSION:
+                raise ValueError('Not a timezone database, or unsupported format')
+        except Exception as e:
+            self.buf.close()
+            raise RuntimeError(f'{e} reading {filename}')
+        self.version = version.rstrip(b'\0').decode()
+
+    def close(self):
+        self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.zone_count
+
+    def get_string(self, offset: int) -> bytes:
+        start = self.strings_offset + offset
+        return self.buf[start:self.buf.find(b'\0', start)]
+
+    def get_zone_name(self, index: int) -> bytes:
+        name_ofs, = unpack_from('<I', self.buf, self.zones_offset + index * ZONE_SIZE)
+        return self.get_string(name_ofs)
+
+    def names(self):
+        for i in range(self.zone_count):
+            yield self.get_zone_name(i).decode()
+
+    def find_index(self, name: str) -> int:
+        """Binary search for zone, returns -1 if not found"""
+        key = name.encode()
+        lo, hi = 0, self.zone_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_zone_name(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.zone_count and self.get_zone_name(lo) == key:
+            return lo
+        return -1
+
+    def get_designator(self, desigidx: int) -> str:
+        offset, = unpack_from(DESIG_FMT, self.buf, self.desigs_offset + desigidx * DESIG_SIZE)
+        return self.get_string(offset).decode()
+
+    @property
+    def designators(self) -> list[str]:
+        return [self.get_designator(i) for i in range(self.desig_count)]
+
+    def get_zone(self, index: int) -> PackZone:
+        name_ofs, rule_idx, count, start = unpack_from(ZONE_FMT, self.buf, self.zones_offset + index * ZONE_SIZE)
+        tzstr_ofs, = unpack_from('<I', self.buf, self.rules_offset + rule_idx * RULE_SIZE)
+        tzstr = self.get_string(tzstr_ofs).decode()
+        offset = self.transitions_offset + start * TRANSITION_SIZE
+        transitions = [unpack_transition(self.buf[pos:pos + TRANSITION_SIZE])
+            for pos in range(offset, offset + count * TRANSITION_SIZE, TRANSITION_SIZE)]
+        return PackZone(self.get_string(name_ofs).decode(), tzstr, decode_tzstr(tzstr), transitions)
+
+    def find(self, name: str) -> PackZone:
+        index = self.find_index(name)
+        return self.get_zone(index) if index >= 0 else None
+
+    def get_zones(self) -> list[PackZone]:
+        """Read all zones. Transitions are converted to use offsets into `tznames`, as TimezoneInfo."""
+        tznames = bytearray()
+        desig_offsets = []
+        for name in self.designators:
+            desig_offsets.append(len(tznames))
+            tznames += name.encode() + b'\0'
+        tznames = bytes(tznames)
+        zones = []
+        for i in range(self.zone_count):
+            zone = self.get_zone(i)
+            zone.transitions = [Transition(t.time, desig_offsets[t.desigidx], t.offset, t.isdst) for t in zone.transitions]
+            zone.tznames = tznames
+            zones.append(zone)
+        return zones
+
+
+def get_zone_content(zone) -> tuple:
+    """Values which determine how a zone is written to a database, for comparison"""
+    return (zone.tzstr, tuple((t.time, get_tzname(zone.tznames, t.desigidx), t.offset, t.isdst)
+        for t in zone.transitions or []))
+
+
+def get_zone_changes(old, new) -> list[str]:
+    """Describe differences between two versions of a zone"""
+    changes = []
+    if old.tzstr != new.tzstr:
+        changes.append('tzstr')
+    if decode_tzstr(old.tzstr) != decode_tzstr(new.tzstr):
+        changes.append('rules')
+    if get_zone_content(old)[1] != get_zone_content(new)[1]:
+        changes.append('transitions')
+    return changes
+
+
+@dataclass
+class Patch:
+    old_version: str
+    new_version: str
+    old_crc: int
+    new_crc: int
+    removed: list[str]
+    zones: list[PackZone]
+
+    @classmethod
+    def create(cls, old_version: str, old_data: bytes, old_zones: list, new_version: str, new_data: bytes, new_zones: list) -> Patch:
+        """Create patch given old and new database file content and the zones they were written from"""
+        old_index = {zone.name: zone for zone in old_zones}
+        new_names = {zone.name for zone in new_zones}
+        removed = sorted(name for name in old_index if name not in new_names)
+        zones = [zone for zone in sorted(new_zones, key=lambda z: z.name)
+            if zone.name not in old_index or get_zone_content(old_index[zone.name]) != get_zone_content(zone)]
+        return cls(old_version, new_version, zlib.crc32(old_data), zlib.crc32(new_data), removed, zones)
+
+    def write(self, fp) -> int:
+        """Write patch to file, returns number of bytes written"""
+        body = bytearray()
+        for name in self.removed:
+            body += name.encode() + b'\0'
+        for zone in self.zones:
+            body += zone.name.encode() + b'\0' + zone.tzstr.encode() + b'\0'
+            desigs = {}
+            for t in zone.transitions or []:
+                desigs.setdefault(get_tzname(zone.tznames, t.desigidx), len(desigs))
+            body.append(len(desigs))
+            for name in desigs:
+                body += name.encode() + b'\0'
+            transitions = zone.transitions or []
+            body += pack('<H', len(transitions))
+            for t in transitions:
+                body += pack_transition(Transition(t.time, desigs[get_tzname(zone.tznames, t.desigidx)], t.offset, t.isdst))
+        header = pack(PATCH_HEADER_FMT, PATCH_MAGIC, PATCH_FORMAT_VERSION, self.old_version.encode(), self.new_version.encode(),
+            self.old_crc, self.new_crc, len(self.removed), len(self.zones))
+        data = header + zlib.compress(body, 9)
+        fp.write(data)
+        return len(data)
+
+    @classmethod
+    def read(cls, filename: str) -> Patch:
+        with open(filename, 'rb') as f:
+            data = f.read()
+        try:
+            magic, fmtver, old_version, new_version, old_crc, new_crc, removed_count, zone_count = unpack_from(PATCH_HEADER_FMT, data)
+            if magic != PATCH_MAGIC or fmtver != PATCH_FORMAT_VERSION:
+                raise ValueError('Not a timezone database patch, or unsupported format')
+            body = zlib.decompress(data[PATCH_HEADER_SIZE:])
+            offset = 0
+
+            def get_string() -> str:
+                nonlocal offset
+                end = body.index(0, offset)
+                s = body[offset:end].decode()
+                offset = end + 1
+                return s
+
+            removed = [get_string() for _ in range(removed_count)]
+            zones = []
+            for _ in range(zone_count):
+                name = get_string()
+                tzstr = get_string()
+                desig_count = body[offset]
+                offset += 1
+                desigs = [get_string() for _ in range(desig_count)]
+                count, = unpack_from('<H', body, offset)
+                offset += 2
+                tznames = b''.join(d.encode() + b'\0' for d in desigs)
+                desig_offsets = [tznames.index(d.encode() + b'\0') for d in desigs]
+                transitions = []
+                for _ in range(count):
+                    t = unpack_transition(body[offset:offset + TRANSITION_SIZE])
+                    offset += TRANSITION_SIZE
+                    transitions.append(Transition(t.time, desig_offsets[t.desigidx], t.offset, t.isdst))
+                zones.append(PackZone(name, tzstr, decode_tzstr(tzstr), transitions, tznames))
+        except Exception as e:
+            raise RuntimeError(f'{e} reading {filename}')
+        return cls(old_version.rstrip(b'\0').decode(), new_version.rstrip(b'\0').decode(), old_crc, new_crc, removed, zones)
+
+    def apply(self, filename: str) -> bytes:
+        """Get content of new database given the old one"""
+        with TzPack(filename) as db:
+            if zlib.crc32(db.buf) != self.old_crc:
+                raise ValueError(f'Patch does not apply to {filename} (expecting version {self.old_version})')
+            zones = {zone.name: zone for zone in db.get_zones()}
+        for name in self.removed:
+            del zones[name]
+        for zone in self.zones:
+            zones[zone.name] = zone
+        output = io.BytesIO()
+        write_pack(output, self.new_version, zones.values())
+        data = output.getvalue()
+        if zlib.crc32(data) != self.new_crc:
+            raise ValueError('Patched database does not match expected content')
+        return data
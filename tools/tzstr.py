@@ -8,28 +8,69 @@ Only the 'M' format is implemented as it's the only one currently in use
 
 import os
 import re
+from bisect import bisect_right
 from dataclasses import dataclass
+from functools import lru_cache
 
 DST_OFFSET_DEFAULT = 3600
+SECS_PER_DAY = 86400
 
 
-@dataclass
+def days_from_civil(year: int, month: int, day: int) -> int:
+    """Days since 1970-01-01 for a proleptic Gregorian date, valid for any year. Month is 1-based."""
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def civil_from_days(days: int) -> tuple[int, int, int]:
+    """Inverse of days_from_civil, returns (year, month, day)"""
+    days += 719468
+    era = days // 146097
+    doe = days - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + (3 if mp < 10 else -9)
+    return yoe + era * 400 + (month <= 2), month, day
+
+
+def get_year(t: int) -> int:
+    """Year for a timestamp"""
+    return civil_from_days(t // SECS_PER_DAY)[0]
+
+
+def _reduce(obj):
+    """Frozen objects with __slots__ cannot be unpickled by attribute assignment, so re-construct them"""
+    return obj.__class__, tuple(getattr(obj, name) for name in obj.__slots__)
+
+
+@dataclass(frozen=True)
 class Time:
-    hour: int = 2
-    minute: int = 0
-    second: int = 0
+    __slots__ = ('hour', 'minute', 'second')
+    hour: int
+    minute: int
+    second: int
 
-    def __init__(self, s: str = None):
-        if s is None:
-            return
-        fields = s.split(':')
-        if fields:
-            self.hour = int(fields.pop(0))
-            # Note: POSIX says non-negative, but Scoresbysund and Nuuk both violate this
-        if fields:
-            self.minute = int(fields.pop(0))
-        if fields:
-            self.second = int(fields.pop(0))
+    __reduce__ = _reduce
+
+    @classmethod
+    def parse(cls, s: str = None):
+        """Parse time, defaulting to 02:00:00"""
+        fields = s.split(':') if s else []
+        # Note: POSIX says hour is non-negative, but Scoresbysund and Nuuk both violate this
+        values = [int(f) for f in fields[:3]]
+        return cls(*values, *[2, 0, 0][len(values):])
+
+    @property
+    def seconds(self) -> int:
+        # Sign of hour applies to whole value, e.g. '-1:30'
+        secs = self.minute * 60 + self.second
+        return self.hour * 3600 + (-secs if self.hour < 0 else secs)
 
 
 def decode_offset(s: str) -> int:
@@ -48,57 +89,137 @@ def decode_offset(s: str) -> int:
     return -seconds * sign
 
 
-@dataclass
+RULE_PATTERN = re.compile(r'M(\d+)\.(\d+)\.(\d+)/?(.+)?')
+
+TZSTR_PATTERN = re.compile(r'''
+    (<[^>]+>|[a-zA-Z]+)([\d:\-+]+)      # std offset
+    (<[^>]+>|[a-zA-Z]+)?([\d:\-+]+)?    # [ dst [offset]
+    ,?([^,]+)?,?([^,]+)?                # [ , date [ / time ] [,date[/time]] ]
+    ''', flags=re.VERBOSE)
+
+
+@dataclass(frozen=True)
 class Rule:
+    __slots__ = ('name', 'offset', 'month', 'week', 'day', 'time')
     name: str
     offset: int
-    month: int = 0
-    week: int = 1   # 1 <= week <= 5 (5 indicates 'last')
-    day: int = 0    # 0=Sunday
-    time: Time = None
-
-    def __init__(self, name: str, offset: int, expr: str):
-        self.name = name.strip('<>')
-        self.offset = offset
-        if expr is None:
-            self.time = Time()
-            return
-        m = re.match(r'M(\d+)\.(\d+)\.(\d+)/?(.+)?', expr)
-        if m is None:
-            self.time = Time()
-            return
-        g = m.groups()
-        self.month = int(g[0]) - 1
-        self.week = int(g[1])
-        self.day = int(g[2])
-        self.time = Time(g[3])
+    month: int
+    week: int   # 1 <= week <= 5 (5 indicates 'last')
+    day: int    # 0=Sunday
+    time: Time
 
+    __reduce__ = _reduce
 
-@dataclass
+    @classmethod
+    def parse(cls, name: str, offset: int, expr: str):
+        name = name.strip('<>')
+        m = RULE_PATTERN.match(expr) if expr else None
+        if m is None:
+            return cls(name, offset, 0, 1, 0, Time.parse())
+        g = m.groups()
+        return cls(name, offset, int(g[0]) - 1, int(g[1]), int(g[2]), Time.parse(g[3]))
+
+    def get_time(self, year: int) -> int:
+        """Get the time this rule takes effect in the given year.
+        This is a local time (seconds since 1970) relative to the offset in effect before the change.
+        """
+        month = self.month + 1
+        first = days_from_civil(year, month, 1)
+        # 1970-01-01 was a Thursday
+        day = first + (self.day - (first + 4)) % 7 + (self.week - 1) * 7
+        if self.week == 5:
+            next_month = days_from_civil(year + (month == 12), month % 12 + 1, 1)
+            while day >= next_month:
+                day -= 7
+        return day * SECS_PER_DAY + self.time.seconds
+
+
+@dataclass(frozen=True)
 class RulePair:
+    __slots__ = ('std', 'dst', 'tzstr')
     std: Rule
     dst: Rule
+    tzstr: str
+
+    def __reduce__(self):
+        # Use the shared instance when passed between processes
+        return decode_tzstr, (self.tzstr,)
+
+    def get_changes(self, year: int) -> tuple[int, int]:
+        """Get UTC times for start of daylight savings and start of standard time in the given year"""
+        return (self.dst.get_time(year) - self.std.offset, self.std.get_time(year) - self.dst.offset)
 
 
+@lru_cache(maxsize=None)
 def decode_tzstr(tzstr: str) -> RulePair:
+    """Decode a POSIX timezone string.
+    Results are cached, so zones with the same string share a single (immutable) RulePair.
+    """
     try:
-        if tzstr[0] == ':':
-            tzstr = tzstr[1:]
-        m = re.match(r'''
-            (<[^>]+>|[a-zA-Z]+)([\d:\-+]+)      # std offset
-            (<[^>]+>|[a-zA-Z]+)?([\d:\-+]+)?    # [ dst [offset]
-            ,?([^,]+)?,?([^,]+)?                # [ , date [ / time ] [,date[/time]] ]
-            ''', tzstr, flags=re.VERBOSE)
+        m = TZSTR_PATTERN.match(tzstr[1:] if tzstr[0] == ':' else tzstr)
         g = m.groups()
-        std = Rule(g[0], decode_offset(g[1]), g[5])
+        std = Rule.parse(g[0], decode_offset(g[1]), g[5])
         if g[2]:
             if g[3]:
                 offset = decode_offset(g[3])
             else:
                 offset = std.offset + DST_OFFSET_DEFAULT
-            dst = Rule(g[2], offset, g[4])
+            dst = Rule.parse(g[2], offset, g[4])
         else:
             dst = None
-        return RulePair(std, dst)
+        return RulePair(std, dst, tzstr)
     except:
         raise ValueError(f'Invalid TZ string "{tzstr}"')
+
+
+class RuleEvaluator:
+    """Calculate transition times for a RulePair.
+
+    Results are cached per year so repeated queries, or queries over ranges of time, are fast.
+    Handles negative rule times and southern hemisphere zones where DST spans the new year.
+    """
+
+    def __init__(self, rules: RulePair, cache_size: int = 64):
+        self.rules = rules
+        self.get_changes = lru_cache(maxsize=cache_size)(rules.get_changes)
+        self.get_window = lru_cache(maxsize=cache_size)(self._get_window)
+
+    def get_year_transitions(self, year: int) -> list[tuple[int, bool]]:
+        """Get transitions for rules in the given year as sorted list of (utc, isdst)"""
+        if not self.rules.dst:
+            return []
+        dst_start, std_start = self.get_changes(year)
+        return sorted([(dst_start, True), (std_start, False)])
+
+    def _get_window(self, year: int) -> tuple[list[int], list[bool]]:
+        """Get sorted transition times which may affect times within the given UTC year,
+        with a list indicating whether each is the start of daylight savings.
+        Rule times are local so a change may fall into an adjacent UTC year.
+        """
+        changes = []
+        for y in (year - 1, year, year + 1):
+            changes += self.get_year_transitions(y)
+        changes.sort()
+        return [c[0] for c in changes], [c[1] for c in changes]
+
+    def is_dst(self, utc: int) -> bool:
+        """Determine whether daylight savings is in effect at a given UTC time"""
+        if not self.rules.dst:
+            return False
+        times, isdst = self.get_window(get_year(utc))
+        return isdst[bisect_right(times, utc) - 1]
+
+    def get_rule(self, utc: int) -> Rule:
+        """Get rule in effect at a given UTC time"""
+        return self.rules.dst if self.is_dst(utc) else self.rules.std
+
+    def transitions(self, start: int, end: int):
+        """Yield (utc, isdst) for all transitions where start <= utc < end"""
+        if not self.rules.dst:
+            return
+        for year in range(get_year(start) - 1, get_year(end) + 2):
+            for utc, isdst in self.get_year_transitions(year):
+                if utc >= end:
+                    return
+                if utc >= start:
+                    yield utc, isdst
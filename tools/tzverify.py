@@ -0,0 +1,104 @@
+"""
+Verify decoded POSIX rules against python's zoneinfo module and the TZif transition list
+
+For each year of interest, the local time type (offset, isdst, designator) is evaluated
+either side of every rule and TZif transition, and at the start and middle of the year.
+Two checks are made:
+
+    zoneinfo    Result from the transition list, or from the zone's `RulePair` after the last transition,
+                is compared with `zoneinfo.ZoneInfo` loaded from the same TZif file.
+                This verifies our parsing and rule evaluation.
+    rules       Result from the `RulePair` is compared with the transition list, where the time falls within it.
+                Differences are times where devices using only the POSIX rules will be wrong,
+                for example zones with Ramadan transitions (Africa/Casablanca) or recent rule changes.
+
+Example:
+
+    mismatches = verify_zone('/usr/share/zoneinfo', 'Europe/London', 2024, 2054)
+
+"""
+
+from __future__ import annotations
+import os
+from bisect import bisect_right
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from tzif import TzFile
+from tzstr import RuleEvaluator, decode_tzstr, days_from_civil, SECS_PER_DAY
+
+
+@dataclass
+class LocalType:
+    offset: int # Seconds east of UTC
+    isdst: bool
+    designator: str
+
+
+@dataclass
+class Mismatch:
+    zone: str
+    utc: int
+    time: str # ISO format UTC time
+    check: str # 'zoneinfo' or 'rules'
+    expected: LocalType
+    actual: LocalType
+
+    def asdict(self) -> dict:
+        return asdict(self)
+
+
+def get_sample_times(evaluator: RuleEvaluator, transitions, start: int, end: int) -> list[int]:
+    """Times either side of each rule and TZif transition in the given range"""
+    times = set()
+    for utc, _ in evaluator.transitions(start, end):
+        times |= {utc - 1, utc}
+    i = bisect_right(transitions, start)
+    while i < len(transitions) and transitions[i] < end:
+        times |= {transitions[i] - 1, transitions[i]}
+        i += 1
+    return sorted(times)
+
+
+def verify_zone(zoneinfo_path: str, zone: str, first_year: int, last_year: int) -> list[Mismatch]:
+    """Compare local time types for a zone over the given (inclusive) range of years"""
+    from zoneinfo import ZoneInfo
+
+    filename = os.path.join(zoneinfo_path, zone)
+    tzfile = TzFile(filename, fast=True)
+    with open(filename, 'rb') as f:
+        zi = ZoneInfo.from_file(f, key=zone)
+    info = tzfile.info[-1]
+    transitions = info.transitions
+    evaluator = RuleEvaluator(decode_tzstr(tzfile.tzstr))
+
+    def get_rule_type(utc: int) -> LocalType:
+        rule = evaluator.get_rule(utc)
+        return LocalType(rule.offset, rule is evaluator.rules.dst, rule.name)
+
+    def get_zoneinfo_type(utc: int) -> LocalType:
+        dt = datetime.fromtimestamp(utc, tz=timezone.utc).astimezone(zi)
+        return LocalType(int(dt.utcoffset().total_seconds()), bool(dt.dst()), dt.tzname())
+
+    def get_tzif_type(utc: int) -> LocalType:
+        i = bisect_right(transitions, utc) - 1
+        idx = info.ttindex[i] if i >= 0 else 0
+        return LocalType(info.utoff[idx], bool(info.isdst[idx]), info.get_tzname(info.desigidx[idx]))
+
+    mismatches = []
+    for year in range(first_year, last_year + 1):
+        start = days_from_civil(year, 1, 1) * SECS_PER_DAY
+        end = days_from_civil(year + 1, 1, 1) * SECS_PER_DAY
+        times = [start, days_from_civil(year, 7, 1) * SECS_PER_DAY] + get_sample_times(evaluator, transitions, start, end)
+        for utc in times:
+            rule_type = get_rule_type(utc)
+            # Times after the last transition use the POSIX rule
+            tzif_type = get_tzif_type(utc) if transitions and utc < transitions[-1] else None
+            results = [
+                ('zoneinfo', tzif_type or rule_type, get_zoneinfo_type(utc)),
+                ('rules', tzif_type or rule_type, rule_type),
+            ]
+            for check, expected, actual in results:
+                if actual != expected:
+                    time = datetime.fromtimestamp(utc, tz=timezone.utc).isoformat()
+                    mismatches.append(Mismatch(zone, utc, time, check, expected, actual))
+    return mismatches
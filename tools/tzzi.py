@@ -0,0 +1,726 @@
+"""
+Compile zones directly from the compact IANA database source `tzdata.zi`
+
+See https://data.iana.org/time-zones/tzdb/zic.8.txt or `man zic`
+
+`tzdata.zi` is installed alongside the compiled TZif files and contains the entire database
+(Rule, Zone and Link lines) in about 100KB of text. Reading it once is much cheaper than
+opening several hundred TZif files.
+
+The algorithm here follows that of `zic` so the resulting transitions, designator lists and
+POSIX strings are identical to those in the installed TZif files.
+Most distributions build 'fat' files (`zic -b fat`), which contain explicit transitions up to 2037.
+The 'slim' variant (e.g. as used by the python tzdata package) stops listing transitions once
+the POSIX string takes over.
+"""
+
+from __future__ import annotations
+import os
+from array import array
+from dataclasses import dataclass, field
+from tzif import Header, TzInfo, TzFile
+from tzstr import days_from_civil
+
+ZIC_MIN = -2**63
+ZIC_MAX = 2**63 - 1
+MIN_TIME = ZIC_MIN
+MAX_TIME = ZIC_MAX
+Y2038_BOUNDARY = 2**31
+EPOCH_YEAR = 1970
+
+SECS_PER_MIN = 60
+SECS_PER_HOUR = 3600
+SECS_PER_DAY = 86400
+
+# Day codes
+DC_DOM = 0  # 1..31, day of month
+DC_DOWGEQ = 1  # 3=Sun>=3
+DC_DOWLEQ = 2  # lastSun or Sun<=8
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+DAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+LAST_NAMES = ['last' + day for day in DAY_NAMES]
+MONTH_LENGTHS = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+
+def isleap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def byword(word: str, table: list[str]) -> int:
+    """Lookup word in table, accepting unambiguous abbreviations as zic does.
+    Returns index or -1 if not found.
+    """
+    word = word.lower()
+    for i, w in enumerate(table):
+        if word == w.lower():
+            return i
+    found = -1
+    for i, w in enumerate(table):
+        if w.lower().startswith(word):
+            if found >= 0:
+                return -1
+            found = i
+    return found
+
+
+def gethms(s: str) -> int:
+    """Parse a signed [-]hh[:mm[:ss[.f]]] field to seconds"""
+    if not s or s == '-':
+        return 0
+    sign = 1
+    if s[0] == '-':
+        sign = -1
+        s = s[1:]
+    parts = s.split(':')
+    hh = int(parts[0])
+    mm = int(parts[1]) if len(parts) > 1 else 0
+    ss = 0
+    if len(parts) > 2:
+        sec, _, frac = parts[2].partition('.')
+        ss = int(sec)
+        # Round to even, as zic
+        if frac:
+            tenths = int(frac[0])
+            if tenths > 5 or (tenths == 5 and (frac[1:].strip('0') or ss % 2)):
+                ss += 1
+    return sign * (hh * SECS_PER_HOUR + mm * SECS_PER_MIN + ss)
+
+
+def getsave(s: str) -> tuple[int, bool]:
+    """Parse a SAVE field with optional 's' or 'd' suffix, returns (save, isdst)"""
+    dst = None
+    if s and s[-1] in 'sd':
+        dst = s[-1] == 'd'
+        s = s[:-1]
+    save = gethms(s)
+    return save, save != 0 if dst is None else dst
+
+
+@dataclass
+class ZiRule:
+    loyear: int = 0
+    hiyear: int = 0
+    hiwasnum: bool = False
+    month: int = 0
+    dycode: int = DC_DOM
+    dayofmonth: int = 1
+    wday: int = 0
+    tod: int = 0
+    todisstd: bool = False
+    todisut: bool = False
+    save: int = 0
+    isdst: bool = False
+    abbrvar: str = ''
+
+    @classmethod
+    def parse(cls, loyear: str, hiyear: str, month: str, day: str, time: str) -> ZiRule:
+        rule = cls()
+        # Year work
+        i = byword(loyear, ['minimum', 'maximum'])
+        rule.loyear = ZIC_MIN if i == 0 else ZIC_MAX if i == 1 else int(loyear)
+        i = byword(hiyear, ['minimum', 'maximum', 'only'])
+        rule.hiwasnum = i < 0
+        rule.hiyear = ZIC_MIN if i == 0 else ZIC_MAX if i == 1 else rule.loyear if i == 2 else int(hiyear)
+        # Month work
+        rule.month = byword(month, MONTH_NAMES)
+        if rule.month < 0:
+            raise ValueError(f'Invalid month name "{month}"')
+        # Day work
+        i = byword(day, LAST_NAMES)
+        if i >= 0:
+            rule.dycode = DC_DOWLEQ
+            rule.wday = i
+            rule.dayofmonth = MONTH_LENGTHS[rule.month]
+        else:
+            for sep, dycode in ('<=', DC_DOWLEQ), ('>=', DC_DOWGEQ):
+                if sep in day:
+                    rule.dycode = dycode
+                    wday, _, day = day.partition(sep)
+                    rule.wday = byword(wday, DAY_NAMES)
+                    if rule.wday < 0:
+                        raise ValueError(f'Invalid weekday name "{wday}"')
+                    break
+            rule.dayofmonth = int(day)
+        # Time work
+        if time and time[-1].lower() in 'swguz':
+            suffix = time[-1].lower()
+            time = time[:-1]
+            rule.todisstd = suffix != 'w'
+            rule.todisut = suffix in 'guz'
+        rule.tod = gethms(time)
+        return rule
+
+    def get_time(self, year: int) -> int:
+        """Local time of rule in given year, in seconds (rpytime)"""
+        if year == ZIC_MIN:
+            return MIN_TIME
+        if year == ZIC_MAX:
+            return MAX_TIME
+        day = self.dayofmonth
+        if self.month == 1 and day == 29 and not isleap(year):
+            if self.dycode != DC_DOWLEQ:
+                raise ValueError('Use of 2/29 in non leap-year')
+            day -= 1
+        dayoff = days_from_civil(year, self.month + 1, day)
+        if self.dycode != DC_DOM:
+            # 1970-01-01 was a Thursday
+            wday = (dayoff + 4) % 7
+            if self.dycode == DC_DOWGEQ:
+                dayoff += (self.wday - wday) % 7
+            else:
+                dayoff -= (wday - self.wday) % 7
+        return dayoff * SECS_PER_DAY + self.tod
+
+
+class ZiRuleSet(list):
+    """Rules sharing a name.
+    Sets are shared between many zones so rule times are cached per year.
+    """
+    def __init__(self):
+        super().__init__()
+        self.year_cache = {}
+
+    @property
+    def years(self) -> range:
+        """Range of years in which any rule applies"""
+        return range(min(rule.loyear for rule in self), max(rule.hiyear for rule in self) + 1)
+
+    def get_times(self, year: int) -> dict[int, int]:
+        """Get local times of rules in effect for given year, keyed by rule index"""
+        times = self.year_cache.get(year)
+        if times is None:
+            times = self.year_cache[year] = {
+                j: rule.get_time(year) for j, rule in enumerate(self) if rule.loyear <= year <= rule.hiyear}
+        return times
+
+
+def rule_cmp(a: ZiRule, b: ZiRule) -> int:
+    """Compare final years of rules"""
+    if a is None:
+        return -1 if b else 0
+    if b is None:
+        return 1
+    if a.hiyear != b.hiyear:
+        return -1 if a.hiyear < b.hiyear else 1
+    if a.hiyear == ZIC_MAX:
+        return 0
+    if a.month != b.month:
+        return a.month - b.month
+    return a.dayofmonth - b.dayofmonth
+
+
+@dataclass
+class ZiZone:
+    """A single zone line"""
+    stdoff: int
+    rule: str
+    format: str
+    format_specifier: str = ''
+    rules: ZiRuleSet = field(default_factory=ZiRuleSet)
+    save: int = 0
+    isdst: bool = False
+    untilrule: ZiRule = None
+    untiltime: int = MAX_TIME
+
+    @classmethod
+    def parse(cls, fields: list[str]) -> ZiZone:
+        stdoff, rule, format = fields[:3]
+        i = format.find('%')
+        zone = cls(gethms(stdoff), '' if rule == '-' else rule, format)
+        if i >= 0:
+            zone.format_specifier = format[i + 1]
+            if zone.format_specifier == 'z':
+                zone.format = format[:i + 1] + 's' + format[i + 2:]
+        until = fields[3:]
+        if until:
+            until += ['Jan', '1', '0'][len(until) - 1:]
+            zone.untilrule = ZiRule.parse(until[0], 'only', *until[1:4])
+            zone.untiltime = zone.untilrule.get_time(zone.untilrule.loyear)
+        return zone
+
+
+# Passed as `letters` to make `doabbr` fail if the format requires them
+DISABLE_PERCENT_S = object()
+
+
+def abbroffset(offset: int) -> str:
+    """Designator for %z format"""
+    sign = '+'
+    if offset < 0:
+        offset = -offset
+        sign = '-'
+    seconds = offset % 60
+    offset //= 60
+    minutes = offset % 60
+    hours = offset // 60
+    s = f'{sign}{hours:02}'
+    if minutes or seconds:
+        s += f'{minutes:02}'
+        if seconds:
+            s += f'{seconds:02}'
+    return s
+
+
+def doabbr(zone: ZiZone, letters: str, isdst: bool, save: int, doquotes: bool) -> str:
+    format = zone.format
+    slash = format.find('/')
+    if slash < 0:
+        if zone.format_specifier == 'z':
+            letters = abbroffset(zone.stdoff + save)
+        elif letters is None:
+            letters = '%s'
+        elif letters is DISABLE_PERCENT_S:
+            return ''
+        abbr = format.replace('%s', letters, 1)
+    elif isdst:
+        abbr = format[slash + 1:]
+    else:
+        abbr = format[:slash]
+    if doquotes and (not abbr or not abbr.isascii() or not abbr.isalpha()):
+        abbr = f'<{abbr}>'
+    return abbr
+
+
+def stringoffset(offset: int) -> str:
+    negative = offset < 0
+    if negative:
+        offset = -offset
+    seconds = offset % 60
+    offset //= 60
+    minutes = offset % 60
+    hours = offset // 60
+    if hours >= 24 * 7:
+        return None
+    s = f'-{hours}' if negative else str(hours)
+    if minutes or seconds:
+        s += f':{minutes:02}'
+        if seconds:
+            s += f':{seconds:02}'
+    return s
+
+
+def stringrule(rule: ZiRule, save: int, stdoff: int) -> str:
+    tod = rule.tod
+    if rule.dycode == DC_DOM:
+        if rule.dayofmonth == 29 and rule.month == 1:
+            return None
+        total = sum(MONTH_LENGTHS[:rule.month]) - (rule.month > 1)
+        # Omit the "J" in Jan and Feb, as that's shorter
+        if rule.month <= 1:
+            s = str(total + rule.dayofmonth - 1)
+        else:
+            s = f'J{total + rule.dayofmonth}'
+    else:
+        wday = rule.wday
+        if rule.dycode == DC_DOWGEQ:
+            wdayoff = (rule.dayofmonth - 1) % 7
+            wday -= wdayoff
+            tod += wdayoff * SECS_PER_DAY
+            week = 1 + (rule.dayofmonth - 1) // 7
+        elif rule.dayofmonth == MONTH_LENGTHS[rule.month]:
+            week = 5
+        else:
+            wdayoff = rule.dayofmonth % 7
+            wday -= wdayoff
+            tod += wdayoff * SECS_PER_DAY
+            week = rule.dayofmonth // 7
+        s = f'M{rule.month + 1}.{week}.{wday % 7}'
+    if rule.todisut:
+        tod += stdoff
+    if rule.todisstd and not rule.isdst:
+        tod += save
+    if tod != 2 * SECS_PER_HOUR:
+        offset = stringoffset(tod)
+        if offset is None:
+            return None
+        s += '/' + offset
+    return s
+
+
+def stringzone(zones: list[ZiZone]) -> str:
+    """Build POSIX TZ string from the final zone line, empty if it cannot be represented"""
+    zone = zones[-1]
+    lastrp = [None, None]
+    for rule in zone.rules:
+        cmp = rule_cmp(lastrp[rule.isdst], rule)
+        if cmp < 0:
+            lastrp[rule.isdst] = rule
+        elif cmp == 0:
+            return ''
+    stdrp, dstrp = lastrp
+    if zone.rules:
+        dstcmp = rule_cmp(dstrp, stdrp)
+    else:
+        dstcmp = 1 if zone.isdst else -1
+    stdzone = dstzone = zone
+
+    if dstcmp < 0:
+        # Standard time all year
+        dstrp = None
+    elif dstcmp > 0:
+        # DST all year, fake a timezone with negative DST
+        save = dstrp.save if dstrp else zone.save
+        if save >= 0:
+            stdoff = zone.stdoff + 2 * save
+            stdzone = ZiZone(stdoff, '', 'XXX')
+            dstzone = ZiZone(stdoff, '', zone.format, zone.format_specifier)
+        dstr = ZiRule(month=0, dycode=DC_DOM, dayofmonth=1, tod=0, isdst=True,
+                      save=save if save < 0 else -save, abbrvar=dstrp.abbrvar if dstrp else None)
+        stdr = ZiRule(month=11, dycode=DC_DOM, dayofmonth=31, tod=SECS_PER_DAY + dstr.save, isdst=False,
+                      save=0, abbrvar=stdrp.abbrvar if save < 0 and stdrp else None)
+        dstrp = dstr
+        stdrp = stdr
+
+    res = doabbr(stdzone, stdrp.abbrvar if stdrp else None, False, 0, True)
+    offset = stringoffset(-stdzone.stdoff)
+    if offset is None:
+        return ''
+    res += offset
+    if dstrp is None:
+        return res
+    res += doabbr(dstzone, dstrp.abbrvar, dstrp.isdst, dstrp.save, True)
+    if dstrp.save != SECS_PER_HOUR:
+        offset = stringoffset(-(dstzone.stdoff + dstrp.save))
+        if offset is None:
+            return ''
+        res += offset
+    for rule in dstrp, stdrp:
+        s = stringrule(rule, dstrp.save, stdzone.stdoff)
+        if s is None:
+            return ''
+        res += ',' + s
+    return res
+
+
+@dataclass
+class TimeType:
+    utoff: int
+    isdst: bool
+    abbr: str
+    ttisstd: bool
+    ttisut: bool
+
+
+class ZoneCompiler:
+    """Generate transitions for a zone (zic `outzone` and `writezone`)"""
+
+    def __init__(self, zones: list[ZiZone], bloat: bool):
+        self.bloat = bloat
+        self.types: list[TimeType] = []
+        self.typeindex: dict[tuple, int] = {}
+        self.attypes: list[list] = [] # [at, type, dontmerge]
+        self.defaulttype = -1
+        self.tzstr = stringzone(zones)
+        self.outzone(zones)
+
+    def addtype(self, utoff: int, abbr: str, isdst: bool, ttisstd: bool, ttisut: bool) -> int:
+        if not self.bloat:
+            ttisstd = ttisut = False
+        key = (utoff, isdst, abbr, ttisstd, ttisut)
+        type = self.typeindex.get(key)
+        if type is None:
+            type = self.typeindex[key] = len(self.types)
+            self.types.append(TimeType(*key))
+        return type
+
+    def addtt(self, at: int, type: int):
+        self.attypes.append([at, type, False])
+
+    def outzone(self, zones: list[ZiZone]):
+        min_year = max_year = EPOCH_YEAR
+        def updateminmax(year):
+            nonlocal min_year, max_year
+            min_year = min(min_year, year)
+            max_year = max(max_year, year)
+        for i, zone in enumerate(zones):
+            if i < len(zones) - 1:
+                updateminmax(zone.untilrule.loyear)
+            for rule in zone.rules:
+                updateminmax(rule.loyear)
+                if rule.hiwasnum:
+                    updateminmax(rule.hiyear)
+        if not self.tzstr:
+            raise ValueError('Zone cannot be represented by a TZ string')
+        max_year0 = max_year
+        if self.bloat:
+            # For the benefit of older systems, generate data from 1900 through 2038
+            min_year = min(min_year, 1900)
+            max_year = max(max_year, 2038)
+
+        lastatmax = -1
+        # Latest transition which cannot be deduced from the TZ string
+        nontzlimtime = ZIC_MIN
+        nontzlimtype = -1
+        startttisstd = startttisut = False
+        starttime = 0
+        for i, zone in enumerate(zones):
+            save = 0
+            usestart = i > 0 and zones[i - 1].untiltime > MIN_TIME
+            useuntil = i < len(zones) - 1
+            stdoff = zone.stdoff
+            startoff = stdoff
+            if useuntil and zone.untiltime <= MIN_TIME:
+                continue
+            startbuf = ''
+            if not zone.rules:
+                save = zone.save
+                startbuf = doabbr(zone, None, zone.isdst, save, False)
+                type = self.addtype(stdoff + save, startbuf, zone.isdst, startttisstd, startttisut)
+                if usestart:
+                    self.addtt(starttime, type)
+                    if useuntil and nontzlimtime < starttime:
+                        nontzlimtime = starttime
+                        nontzlimtype = type
+                    usestart = False
+                else:
+                    self.defaulttype = type
+            else:
+                # No need to visit years in which no rules apply
+                years = zone.rules.years
+                for year in range(max(min_year, years.start), min(max_year, years.stop - 1) + 1):
+                    if useuntil and year > zone.untilrule.hiyear:
+                        break
+                    # Mark which rules to do in the current year
+                    todo = {j: t for j, t in zone.rules.get_times(year).items()
+                            if t < Y2038_BOUNDARY or year <= max_year0}
+                    while True:
+                        if useuntil:
+                            # Turn untiltime into UT assuming the current stdoff and save values
+                            untiltime = zone.untiltime
+                            if not zone.untilrule.todisut:
+                                untiltime -= stdoff
+                            if not zone.untilrule.todisstd:
+                                untiltime -= save
+                        # Find the rule (of those to do, if any) that takes effect earliest in the year
+                        k = -1
+                        ktime = 0
+                        for j, jtime in todo.items():
+                            r = zone.rules[j]
+                            offset = 0 if r.todisut else stdoff
+                            if not r.todisstd:
+                                offset += save
+                            if jtime in (MIN_TIME, MAX_TIME):
+                                continue
+                            jtime -= offset
+                            if k < 0 or jtime < ktime:
+                                k = j
+                                ktime = jtime
+                            elif jtime == ktime:
+                                raise ValueError('Two rules for same instant')
+                        if k < 0:
+                            break # go on to next year
+                        rule = zone.rules[k]
+                        del todo[k]
+                        if useuntil and ktime >= untiltime:
+                            if not startbuf and stdoff + rule.save == startoff:
+                                startbuf = doabbr(zone, rule.abbrvar, rule.isdst, rule.save, False)
+                            break
+                        save = rule.save
+                        if usestart and ktime == starttime:
+                            usestart = False
+                        if usestart:
+                            if ktime < starttime:
+                                startoff = stdoff + save
+                                startbuf = doabbr(zone, rule.abbrvar, rule.isdst, rule.save, False)
+                                continue
+                            if not startbuf and startoff == stdoff + save:
+                                startbuf = doabbr(zone, rule.abbrvar, rule.isdst, rule.save, False)
+                        ab = doabbr(zone, rule.abbrvar, rule.isdst, rule.save, False)
+                        offset = stdoff + rule.save
+                        type = self.addtype(offset, ab, rule.isdst, rule.todisstd, rule.todisut)
+                        if self.defaulttype < 0 and not rule.isdst:
+                            self.defaulttype = type
+                        if rule.hiyear == ZIC_MAX and not (lastatmax >= 0 and ktime < self.attypes[lastatmax][0]):
+                            lastatmax = len(self.attypes)
+                        self.addtt(ktime, type)
+                        if (useuntil or rule.hiyear != ZIC_MAX) and nontzlimtime < ktime:
+                            nontzlimtime = ktime
+                            nontzlimtype = type
+            if usestart:
+                isdst = startoff != stdoff
+                if not startbuf and zone.format:
+                    startbuf = doabbr(zone, DISABLE_PERCENT_S, isdst, save, False)
+                if not startbuf:
+                    raise ValueError("Can't determine time zone abbreviation to use just after until time")
+                type = self.addtype(startoff, startbuf, isdst, startttisstd, startttisut)
+                if self.defaulttype < 0 and not isdst:
+                    self.defaulttype = type
+                self.addtt(starttime, type)
+                if useuntil and nontzlimtime < starttime:
+                    nontzlimtime = starttime
+                    nontzlimtype = type
+            # Now we may get to set starttime for the next zone line
+            if useuntil:
+                startttisstd = zone.untilrule.todisstd
+                startttisut = zone.untilrule.todisut
+                starttime = zone.untiltime
+                if not startttisstd:
+                    starttime -= save
+                if not startttisut:
+                    starttime -= stdoff
+        if self.defaulttype < 0:
+            self.defaulttype = 0
+        if lastatmax >= 0:
+            self.attypes[lastatmax][2] = True
+        if not self.bloat:
+            # Omit trailing transitions deducible from the TZ string
+            tzstarttime = min((at for at, _, _ in self.attypes if at > nontzlimtime), default=nontzlimtime)
+            dontmerge = lambda at, type: at == tzstarttime and (type != nontzlimtype or ',' in self.tzstr)
+            self.attypes = [[at, type, dontmerge(at, type)] for at, type, _ in self.attypes if at <= tzstarttime]
+
+    def optimize(self) -> tuple[list[int], list[int]]:
+        """Sort transitions and remove those which change nothing"""
+        self.attypes.sort(key=lambda a: a[0])
+        utoffs = [tt.utoff for tt in self.types]
+        res = []
+        for at in self.attypes:
+            if res:
+                prev_utoff = utoffs[0] if len(res) == 1 else utoffs[res[-2][1]]
+                if at[0] + utoffs[res[-1][1]] <= res[-1][0] + prev_utoff:
+                    res[-1][1] = at[1]
+                    continue
+                prev = self.types[res[-1][1]]
+                cur = self.types[at[1]]
+                if not at[2] and (prev.utoff, prev.isdst, prev.abbr) == (cur.utoff, cur.isdst, cur.abbr):
+                    continue
+            res.append(list(at))
+        ats = [at[0] for at in res]
+        types = [at[1] for at in res]
+        # Work around QTBUG-53071
+        if self.bloat and ats and ats[-1] < Y2038_BOUNDARY - 1 and '<' in self.tzstr:
+            ats.append(Y2038_BOUNDARY - 1)
+            types.append(types[-1])
+        return ats, types
+
+    def get_tzinfo(self) -> TzInfo:
+        """Produce the 64-bit data block as it would appear in a TZif file"""
+        ats, types = self.optimize()
+        defaulttype = self.defaulttype
+        typecnt = len(self.types)
+        omittype = [True] * typecnt
+        omittype[defaulttype] = False
+        for t in types:
+            omittype[t] = False
+        old0 = omittype.index(False)
+
+        def swap(i):
+            return defaulttype if i == old0 else old0 if i == defaulttype else i
+
+        if self.bloat:
+            # For some pre-2011 systems, append an unused copy of the most recently used type
+            # if it differs from the last standard (or daylight) type
+            mru = [-1, -1]
+            for t in types:
+                mru[self.types[t].isdst] = t
+            hi = [-1, -1]
+            for i in range(old0, typecnt):
+                h = swap(i)
+                if not omittype[h]:
+                    hi[self.types[h].isdst] = i
+            for isdst in True, False:
+                if hi[isdst] >= 0 and mru[isdst] >= 0 and hi[isdst] != mru[isdst]:
+                    tt = self.types[mru[isdst]]
+                    if self.types[hi[isdst]].utoff != tt.utoff:
+                        self.types.append(TimeType(tt.utoff, tt.isdst, tt.abbr, tt.ttisstd, tt.ttisut))
+                        omittype.append(False)
+            typecnt = len(self.types)
+
+        typemap = {}
+        order = []
+        for i in range(old0, typecnt):
+            h = swap(i)
+            if not omittype[h]:
+                typemap[h] = len(order)
+                order.append(h)
+
+        # Designators appear in original type order, sharing suffixes where possible
+        tznames = b''
+        indmap = {}
+        for i in range(old0, typecnt):
+            if omittype[i]:
+                continue
+            abbr = self.types[i].abbr.encode() + b'\0'
+            j = tznames.find(abbr)
+            if j < 0:
+                j = len(tznames)
+                tznames += abbr
+            indmap[self.types[i].abbr] = j
+
+        info = TzInfo.__new__(TzInfo)
+        info.transitions = array('q', ats)
+        info.ttindex = array('B', [typemap[t] for t in types])
+        info.tznames = tznames
+        info.set_timetypes((self.types[h].utoff, int(self.types[h].isdst), indmap[self.types[h].abbr]) for h in order)
+        info.leap = []
+        ttisstd = array('B', (self.types[h].ttisstd for h in order))
+        ttisut = array('B', (self.types[h].ttisut for h in order))
+        info.stdwall = ttisstd if any(ttisstd) else array('B')
+        info.utlocal = ttisut if any(ttisut) else array('B')
+        info.hdr = Header(b'TZif', b'2', len(info.utlocal), len(info.stdwall), 0, len(ats), len(order), len(tznames))
+        return info
+
+
+class ZiDatabase:
+    """Contents of a tzdata.zi file"""
+
+    def __init__(self, filename: str):
+        self.version = None
+        self.rules: dict[str, list[ZiRule]] = {}
+        self.zones: dict[str, list[ZiZone]] = {}
+        self.links: dict[str, str] = {}
+        self.compiled: dict[tuple[str, bool], TzFile] = {}
+        with open(filename) as f:
+            zone = None
+            for line in f:
+                line = line.partition('#')[0] if not line.startswith('# version') else line
+                fields = line.split()
+                if not fields:
+                    continue
+                kind = fields[0]
+                if kind == '#':
+                    self.version = fields[2]
+                elif kind == 'R':
+                    rule = ZiRule.parse(fields[2], fields[3], *fields[5:8])
+                    rule.save, rule.isdst = getsave(fields[8])
+                    rule.abbrvar = '' if fields[9] == '-' else fields[9]
+                    self.rules.setdefault(fields[1], ZiRuleSet()).append(rule)
+                elif kind == 'Z':
+                    zone = self.zones[fields[1]] = [ZiZone.parse(fields[2:])]
+                elif kind == 'L':
+                    self.links[fields[2]] = fields[1]
+                    zone = None
+                else:
+                    zone.append(ZiZone.parse(fields))
+        for zone in self.zones.values():
+            for line in zone:
+                if line.rule in self.rules:
+                    line.rules = self.rules[line.rule]
+                else:
+                    line.save, line.isdst = getsave(line.rule)
+
+    def resolve(self, name: str) -> str:
+        """Get name of zone for a link"""
+        while name in self.links:
+            name = self.links[name]
+        return name
+
+    def names(self) -> list[str]:
+        return sorted([*self.zones, *self.links])
+
+    def compile(self, name: str, bloat: bool = True) -> TzFile:
+        """Compile a zone, the result is equivalent to `TzFile(filename, fast=True)`"""
+        key = self.resolve(name), bloat
+        tzfile = self.compiled.get(key)
+        if tzfile is None:
+            compiler = ZoneCompiler(self.zones[key[0]], bloat)
+            tzfile = self.compiled[key] = TzFile.__new__(TzFile)
+            tzfile.info = [compiler.get_tzinfo()]
+            tzfile.tzstr = compiler.tzstr
+        return tzfile
+
+
+def load(zoneinfo_path: str) -> ZiDatabase:
+    from tzdb import TZDATA_ZI
+    return ZiDatabase(os.path.join(zoneinfo_path, TZDATA_ZI))